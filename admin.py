@@ -0,0 +1,160 @@
+"""Admin pages: employee accounts, shared file overview and metrics"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from models import db, replica_reads, User, SharedFile, UserRole, RoleCount, password_hashing, MAX_LOGIN_ATTEMPTS
+from queries import active_shared_files_query, employees_query
+from pagination import CursorPagination
+from cache import invalidate_recipe_listings, invalidate_user
+from auth import require_role, evaluate_password_server
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+@admin.route('/dashboard')
+@replica_reads
+@require_role(UserRole.ADMIN.value)
+def dashboard():
+    """Admin dashboard for managing employees"""
+    employees = employees_query().all()
+    role_counts = RoleCount.counts()
+    user_count = sum(role_counts.values())
+    employee_count = role_counts.get(UserRole.EMPLOYEE.value, 0)
+    
+    return render_template('admin_dashboard.html', 
+                         employees=employees,
+                         user_count=user_count,
+                         employee_count=employee_count)
+
+@admin.route('/metrics/hashing')
+@require_role(UserRole.ADMIN.value)
+def hashing_metrics():
+    """Password hashing latency metrics for this worker process"""
+    return jsonify(password_hashing.stats())
+
+@admin.route('/create-employee', methods=['GET', 'POST'])
+@require_role(UserRole.ADMIN.value)
+def create_employee():
+    """Create new employee account"""
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '')
+        confirm_password = request.form.get('confirm_password', '')
+        
+        # Validation
+        if not all([username, email, password, confirm_password]):
+            flash('All fields are required.', 'danger')
+            return redirect(url_for('admin.create_employee'))
+        
+        if len(username) < 3:
+            flash('Username must be at least 3 characters.', 'danger')
+            return redirect(url_for('admin.create_employee'))
+        
+        if password != confirm_password:
+            flash('Passwords do not match.', 'danger')
+            return redirect(url_for('admin.create_employee'))
+        
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists.', 'danger')
+            return redirect(url_for('admin.create_employee'))
+        
+        if User.query.filter_by(email=email).first():
+            flash('Email already exists.', 'danger')
+            return redirect(url_for('admin.create_employee'))
+        
+        # Server-side password strength check
+        pw_score, pw_recs = evaluate_password_server(password)
+        if pw_score < 2:
+            msg = 'Password is too weak. '
+            if pw_recs:
+                msg += 'Recommendations: ' + '; '.join(pw_recs[:3])
+            flash(msg, 'danger')
+            return redirect(url_for('admin.create_employee'))
+        
+        try:
+            employee = User(username=username, email=email, role=UserRole.EMPLOYEE.value)
+            employee.set_password(password)
+            db.session.add(employee)
+            db.session.commit()
+            
+            flash(f'Employee "{username}" created successfully!', 'success')
+            return redirect(url_for('admin.dashboard'))
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('admin.create_employee'))
+    
+    return render_template('create_employee.html')
+
+@admin.route('/edit-employee/<int:employee_id>', methods=['GET', 'POST'])
+@require_role(UserRole.ADMIN.value)
+def edit_employee(employee_id):
+    """Edit employee details"""
+    employee = User.query.get_or_404(employee_id)
+    
+    # Ensure only employees can be edited
+    if employee.role != UserRole.EMPLOYEE.value:
+        flash('Can only edit employee accounts.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    if request.method == 'POST':
+        new_username = request.form.get('username', '').strip()
+        new_email = request.form.get('email', '').strip()
+        
+        # Validation
+        if not all([new_username, new_email]):
+            flash('Username and email are required.', 'danger')
+            return redirect(url_for('admin.edit_employee', employee_id=employee_id))
+        
+        if len(new_username) < 3:
+            flash('Username must be at least 3 characters.', 'danger')
+            return redirect(url_for('admin.edit_employee', employee_id=employee_id))
+        
+        # Check for duplicates (excluding current employee)
+        if new_username != employee.username and User.query.filter_by(username=new_username).first():
+            flash('Username already exists.', 'danger')
+            return redirect(url_for('admin.edit_employee', employee_id=employee_id))
+        
+        if new_email != employee.email and User.query.filter_by(email=new_email).first():
+            flash('Email already exists.', 'danger')
+            return redirect(url_for('admin.edit_employee', employee_id=employee_id))
+        
+        employee.username = new_username
+        employee.email = new_email
+        db.session.commit()
+        invalidate_user(employee.id)
+        invalidate_recipe_listings()
+        
+        flash(f'Employee "{new_username}" updated successfully!', 'success')
+        return redirect(url_for('admin.dashboard'))
+    
+    return render_template('edit_employee.html', employee=employee)
+
+@admin.route('/reset-username/<int:employee_id>', methods=['POST'])
+@require_role(UserRole.ADMIN.value)
+def reset_username_permission(employee_id):
+    """Grant employee permission to reset their username"""
+    employee = User.query.get_or_404(employee_id)
+    
+    if employee.role != UserRole.EMPLOYEE.value:
+        flash('Can only reset username permission for employees.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    if employee.login_attempts >= MAX_LOGIN_ATTEMPTS:
+        employee.username_reset_enabled = True
+        employee.reset_login_attempts()
+        db.session.commit()
+        invalidate_user(employee.id)
+        flash(f'Username reset enabled for {employee.username}. They can now reset their username.', 'success')
+    else:
+        flash(f'{employee.username} does not have 3 failed login attempts yet.', 'warning')
+    
+    return redirect(url_for('admin.dashboard'))
+
+@admin.route('/view-shared-files')
+@replica_reads
+@require_role(UserRole.ADMIN.value)
+def view_shared_files():
+    """Admin can view all shared files (read-only, cannot download or modify)"""
+    cursor = request.args.get('cursor')
+    shared_files = CursorPagination(active_shared_files_query(), SharedFile, cursor=cursor, per_page=10)
+    
+    return render_template('admin_view_shared_files.html', shared_files=shared_files)
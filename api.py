@@ -0,0 +1,404 @@
+"""Versioned JSON API for the mobile client, mounted at /api/v1.
+
+It serves the same data as the HTML routes and applies the same rules:
+recipes are changed only by their author (``Recipe.editable_by``), shared
+files are seen by admins and their uploader (``SharedFile.visible_to`` and
+``require_role``). Clients authenticate with the session cookie set by
+/login, and send the token from ``GET /api/v1/me`` in an ``X-CSRFToken``
+header on writes.
+
+Every representation carries an ETag. GETs answer ``304`` to a matching
+``If-None-Match``, and PATCH/DELETE honour ``If-Match`` so a client cannot
+overwrite a recipe changed since it was read.
+"""
+
+import hashlib
+from datetime import datetime
+from flask import Blueprint, abort, current_app, jsonify, request, url_for
+from flask_login import current_user, login_required
+from flask_wtf.csrf import generate_csrf
+from sqlalchemy.orm import joinedload, load_only
+from werkzeug.exceptions import HTTPException
+from models import db, replica_reads, Recipe, Comment, SharedFile, UserRole
+from queries import (recipe_listing_query, get_recipe_or_404, recipes_by_ids, recipe_comments_query,
+                     active_shared_files_query, search_recipes, recipes_by_ingredients)
+from pagination import CursorPagination
+from cache import invalidate_recipe, invalidate_recipe_listings
+from auth import require_role
+from facets import DIFFICULTIES, parse_filters, apply_filters
+from jobs import release_later
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+MAX_PER_PAGE = 50
+MAX_BATCH_IDS = 100
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# Recipe field -> (columns it needs, how to render it)
+RECIPE_FIELDS = {
+    'id': ((), lambda r: r.id),
+    'title': (('title',), lambda r: r.title),
+    'description': (('description',), lambda r: r.description),
+    'ingredients': (('ingredients',), lambda r: r.ingredients),
+    'instructions': (('instructions',), lambda r: r.instructions),
+    'cooking_time': (('cooking_time',), lambda r: r.cooking_time),
+    'servings': (('servings',), lambda r: r.servings),
+    'difficulty': (('difficulty',), lambda r: r.difficulty),
+    'comment_count': (('comment_count',), lambda r: r.comment_count),
+    'author': (('user_id',), lambda r: {'id': r.user_id, 'username': r.author.username}),
+    'image_url': (('image_filename',), lambda r: url_for('public.download_file', filename=r.image_filename)
+                  if r.image_filename else None),
+    'created_at': (('created_at',), lambda r: _isoformat(r.created_at)),
+    'updated_at': (('updated_at',), lambda r: _isoformat(r.updated_at)),
+}
+# Fields returned in recipe lists when ``fields`` is not given
+RECIPE_LIST_FIELDS = ('id', 'title', 'description', 'author', 'difficulty', 'cooking_time',
+                      'servings', 'comment_count', 'image_url', 'created_at')
+
+COMMENT_FIELDS = {
+    'id': lambda c: c.id,
+    'content': lambda c: c.content,
+    'author': lambda c: {'id': c.user_id, 'username': c.user.username},
+    'created_at': lambda c: _isoformat(c.created_at),
+}
+
+SHARED_FILE_FIELDS = {
+    'id': lambda f: f.id,
+    'original_filename': lambda f: f.original_filename,
+    'description': lambda f: f.description,
+    'file_size': lambda f: f.file_size,
+    'uploader': lambda f: {'id': f.user_id, 'username': f.uploader.username},
+    'created_at': lambda f: _isoformat(f.created_at),
+    'download_url': lambda f: url_for('employee.download_file', file_id=f.id)
+                    if f.user_id == current_user.id else None,
+}
+
+
+def selected_fields(available, default=None):
+    """Field names from the ``fields`` query parameter, in a stable order.
+
+    Answers 400 for a field the resource does not have.
+    """
+    value = request.args.get('fields')
+    if not value:
+        return tuple(default or available)
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in available if name in names)
+
+
+def recipe_load_options(fields):
+    """Load only the columns the selected fields need, and the author only if asked"""
+    columns = {'id', 'created_at'} | {c for name in fields for c in RECIPE_FIELDS[name][0]}
+    options = [load_only(*(getattr(Recipe, c) for c in sorted(columns)))]
+    if 'author' in fields:
+        options.append(joinedload(Recipe.author))
+    return options
+
+
+def serialize(obj, fields, renderers):
+    return {name: renderers[name](obj) for name in fields}
+
+
+def serialize_recipe(recipe, fields):
+    return {name: RECIPE_FIELDS[name][1](recipe) for name in fields}
+
+
+def per_page_arg(default):
+    return min(max(request.args.get('per_page', default, type=int), 1), MAX_PER_PAGE)
+
+
+def ingredient_terms(param):
+    """Ingredient names from a repeated or comma-separated query parameter"""
+    terms = [term.strip() for value in request.args.getlist(param) for term in value.split(',')]
+    return [term for term in terms if term][:10]
+
+
+def recipe_etag(recipe):
+    """Version tag of a recipe: changes whenever its row does"""
+    version = f'{recipe.id}:{_isoformat(recipe.updated_at)}:{recipe.comment_count}'
+    return hashlib.sha256(version.encode()).hexdigest()[:32]
+
+
+def conditional(response, etag=None):
+    """Tag a GET response and turn it into a 304 when the client's copy is current"""
+    if etag is None:
+        response.add_etag()
+    else:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+
+def check_if_match(recipe):
+    """412 if the client edited an older version of the recipe"""
+    if request.if_match and not request.if_match.contains(recipe_etag(recipe)):
+        abort(412, description='Recipe has changed since it was fetched.')
+
+
+def json_body():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description='Expected a JSON object.')
+    return data
+
+
+def apply_recipe_data(recipe, data, partial=False):
+    """Validate recipe fields from a JSON body and set them on ``recipe``.
+
+    Uses the same rules as the recipe forms. Returns an error message or None.
+    """
+    for name in ('title', 'description', 'ingredients', 'instructions'):
+        if name in data or not partial:
+            value = data.get(name)
+            if not isinstance(value, str) or not value.strip():
+                return 'Title, description, ingredients, and instructions are required.'
+            setattr(recipe, name, value.strip())
+    if len(recipe.title) < 5:
+        return 'Recipe title must be at least 5 characters.'
+    for name in ('cooking_time', 'servings'):
+        if name in data:
+            value = data[name]
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+                return f'{name} must be a whole number.'
+            setattr(recipe, name, value)
+    if 'difficulty' in data or not partial:
+        difficulty = data.get('difficulty', 'Medium')
+        if difficulty not in DIFFICULTIES:
+            return f"difficulty must be one of {', '.join(DIFFICULTIES)}."
+        recipe.difficulty = difficulty
+    return None
+
+
+def owned_recipe_or_error(recipe_id):
+    """Load a recipe the current user may change, honouring If-Match"""
+    recipe = Recipe.query.get_or_404(recipe_id)
+    if not recipe.editable_by(current_user):
+        abort(403, description='You do not have permission to edit this recipe.')
+    check_if_match(recipe)
+    return recipe
+
+
+def http_error(error):
+    """Errors as JSON instead of the HTML error pages"""
+    return jsonify({'error': error.name, 'message': error.description}), error.code
+
+
+# The app's own 404 and 500 handlers would win over a generic HTTPException one
+api.register_error_handler(HTTPException, http_error)
+for code in (404, 500):
+    api.register_error_handler(code, http_error)
+
+
+@api.get('/me')
+@login_required
+def me():
+    """The logged-in user and a CSRF token for write requests"""
+    return jsonify({
+        'id': current_user.id,
+        'username': current_user.username,
+        'email': current_user.email,
+        'role': current_user.role,
+        'csrf_token': generate_csrf(),
+    })
+
+
+@api.get('/recipes')
+@replica_reads
+def list_recipes():
+    """Recipes newest first, or a batch of recipes by id"""
+    fields = selected_fields(RECIPE_FIELDS, RECIPE_LIST_FIELDS)
+    options = recipe_load_options(fields)
+
+    if request.args.get('ids'):
+        try:
+            ids = list(dict.fromkeys(int(i) for i in request.args['ids'].split(',') if i.strip()))
+        except ValueError:
+            abort(400, description='ids must be a comma-separated list of integers.')
+        if len(ids) > MAX_BATCH_IDS:
+            abort(400, description=f'At most {MAX_BATCH_IDS} ids per request.')
+        recipes, missing = recipes_by_ids(ids, options)
+        return conditional(jsonify({
+            'recipes': [serialize_recipe(recipe, fields) for recipe in recipes],
+            'missing': missing,
+        }))
+
+    query = apply_filters(recipe_listing_query().options(*options), parse_filters(request.args))
+    page = CursorPagination(query, Recipe, cursor=request.args.get('cursor'), per_page=per_page_arg(10))
+    return conditional(jsonify({
+        'recipes': [serialize_recipe(recipe, fields) for recipe in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }))
+
+
+@api.get('/search')
+@replica_reads
+def search():
+    """Full-text recipe search, best match first"""
+    fields = selected_fields(RECIPE_FIELDS, RECIPE_LIST_FIELDS)
+    q = request.args.get('q', '').strip()
+    recipes, next_cursor = search_recipes(q, cursor=request.args.get('cursor'), per_page=per_page_arg(10),
+                                          options=recipe_load_options(fields))
+    return conditional(jsonify({
+        'query': q,
+        'recipes': [serialize_recipe(recipe, fields) for recipe in recipes],
+        'next_cursor': next_cursor,
+    }))
+
+
+@api.get('/recipes/by-ingredients')
+@replica_reads
+def recipes_with_ingredients():
+    """Recipes that use every ?include= ingredient and no ?exclude= one, newest first"""
+    fields = selected_fields(RECIPE_FIELDS, RECIPE_LIST_FIELDS)
+    include = ingredient_terms('include')
+    exclude = ingredient_terms('exclude')
+    if not include:
+        abort(400, description='At least one ingredient to include is required.')
+    recipes, next_cursor = recipes_by_ingredients(include, exclude, cursor=request.args.get('cursor'),
+                                                  per_page=per_page_arg(10),
+                                                  options=recipe_load_options(fields))
+    return conditional(jsonify({
+        'include': include,
+        'exclude': exclude,
+        'recipes': [serialize_recipe(recipe, fields) for recipe in recipes],
+        'next_cursor': next_cursor,
+    }))
+
+
+@api.post('/recipes')
+@login_required
+def create_recipe():
+    """Create a recipe from a JSON body"""
+    recipe = Recipe(user_id=current_user.id)
+    error = apply_recipe_data(recipe, json_body())
+    if error:
+        abort(400, description=error)
+    db.session.add(recipe)
+    db.session.commit()
+    invalidate_recipe_listings()
+
+    response = jsonify(serialize_recipe(recipe, tuple(RECIPE_FIELDS)))
+    response.status_code = 201
+    response.headers['Location'] = url_for('api_v1.get_recipe', recipe_id=recipe.id)
+    response.set_etag(recipe_etag(recipe))
+    return response
+
+
+@api.get('/recipes/<int:recipe_id>')
+@replica_reads
+def get_recipe(recipe_id):
+    """One recipe"""
+    fields = selected_fields(RECIPE_FIELDS)
+    recipe = get_recipe_or_404(recipe_id)
+    etag = recipe_etag(recipe)
+    if request.args.get('fields'):
+        etag += '-' + hashlib.sha256(','.join(fields).encode()).hexdigest()[:8]
+    return conditional(jsonify(serialize_recipe(recipe, fields)), etag)
+
+
+@api.patch('/recipes/<int:recipe_id>')
+@login_required
+def update_recipe(recipe_id):
+    """Change some fields of a recipe; author only"""
+    recipe = owned_recipe_or_error(recipe_id)
+    error = apply_recipe_data(recipe, json_body(), partial=True)
+    if error:
+        db.session.rollback()
+        abort(400, description=error)
+    recipe.updated_at = datetime.now()
+    db.session.commit()
+    invalidate_recipe(recipe_id)
+    invalidate_recipe_listings()
+
+    response = jsonify(serialize_recipe(recipe, tuple(RECIPE_FIELDS)))
+    response.set_etag(recipe_etag(recipe))
+    return response
+
+
+@api.delete('/recipes/<int:recipe_id>')
+@login_required
+def delete_recipe(recipe_id):
+    """Delete a recipe; author only"""
+    recipe = owned_recipe_or_error(recipe_id)
+    db.session.delete(recipe)
+    # Delete image once no other recipe or file uses it
+    release_later(recipe.image_filename)
+    db.session.commit()
+    invalidate_recipe(recipe_id)
+    invalidate_recipe_listings()
+    return '', 204
+
+
+@api.get('/recipes/<int:recipe_id>/comments')
+@replica_reads
+def list_comments(recipe_id):
+    """A recipe's comments, newest first"""
+    fields = selected_fields(COMMENT_FIELDS)
+    Recipe.query.get_or_404(recipe_id)
+    page = CursorPagination(recipe_comments_query(recipe_id), Comment, cursor=request.args.get('cursor'),
+                            per_page=per_page_arg(current_app.config['COMMENTS_PER_PAGE']))
+    return conditional(jsonify({
+        'comments': [serialize(comment, fields, COMMENT_FIELDS) for comment in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }))
+
+
+@api.post('/recipes/<int:recipe_id>/comments')
+@login_required
+def create_comment(recipe_id):
+    """Comment on a recipe"""
+    Recipe.query.get_or_404(recipe_id)
+    content = json_body().get('content')
+    content = content.strip() if isinstance(content, str) else ''
+    if not content:
+        abort(400, description='Comment cannot be empty.')
+    if len(content) > 500:
+        abort(400, description='Comment must be less than 500 characters.')
+
+    comment = Comment(content=content, user_id=current_user.id, recipe_id=recipe_id)
+    db.session.add(comment)
+    db.session.commit()
+    invalidate_recipe(recipe_id)
+
+    response = jsonify(serialize(comment, tuple(COMMENT_FIELDS), COMMENT_FIELDS))
+    response.status_code = 201
+    return response
+
+
+@api.get('/shared-files')
+@replica_reads
+@require_role(UserRole.ADMIN.value, UserRole.EMPLOYEE.value)
+def list_shared_files():
+    """Active shared files: every file for admins, their own for employees"""
+    fields = selected_fields(SHARED_FILE_FIELDS)
+    owner = None if current_user.has_role(UserRole.ADMIN.value) else current_user.id
+    query = active_shared_files_query(owner)
+    page = CursorPagination(query, SharedFile, cursor=request.args.get('cursor'), per_page=per_page_arg(10))
+    return conditional(jsonify({
+        'shared_files': [serialize(f, fields, SHARED_FILE_FIELDS) for f in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }))
+
+
+@api.get('/shared-files/<int:file_id>')
+@replica_reads
+@require_role(UserRole.ADMIN.value, UserRole.EMPLOYEE.value)
+def get_shared_file(file_id):
+    """Metadata of one shared file"""
+    fields = selected_fields(SHARED_FILE_FIELDS)
+    shared_file = SharedFile.query.options(joinedload(SharedFile.uploader)).filter_by(
+        id=file_id, is_active=True).first_or_404()
+    if not shared_file.visible_to(current_user):
+        abort(403, description='You do not have permission to view this file.')
+    return conditional(jsonify(serialize(shared_file, fields, SHARED_FILE_FIELDS)))
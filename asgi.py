@@ -0,0 +1,219 @@
+"""ASGI entry point: the Flask app behind an event loop.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+Under WSGI a request holds a worker thread from the first byte of its upload
+to the last byte of its response, so slow clients, large uploads and file
+downloads cap concurrency at workers x threads. Here the event loop owns the
+sockets and the app only borrows a thread for the work in between:
+
+- request bodies are read on the loop (spooled to disk past 64 KB) before the
+  app is called, so a slow upload holds no thread; one declared or grown past
+  MAX_CONTENT_LENGTH is answered 413 at once instead of being spooled;
+- response bodies are pulled from the app in ~64 KB batches on the thread
+  pool and written to the socket on the loop, so a slow download holds no
+  thread while the client reads;
+- routes themselves, including the database work behind listings and the
+  JSON API, run unchanged on a bounded pool of ASGI_THREADS threads.
+
+Every route keeps working: they are the same Flask views as under WSGI.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from app import create_app
+
+SPOOL_SIZE = 64 * 1024  # request bodies larger than this go to a temp file
+BATCH_SIZE = 64 * 1024  # response bytes gathered per trip to the thread pool
+
+
+class AsgiAdapter:
+    """Serve a WSGI application over ASGI with non-blocking request and response I/O"""
+
+    def __init__(self, wsgi_app, threads, max_content_length=None):
+        self.wsgi_app = wsgi_app
+        self.max_content_length = max_content_length
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _too_large(self, length):
+        return self.max_content_length is not None and length > self.max_content_length
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        declared = dict(scope.get('headers', [])).get(b'content-length')
+        if declared is not None and declared.isdigit() and self._too_large(int(declared)):
+            await too_large(send)
+            return
+        with SpooledTemporaryFile(max_size=SPOOL_SIZE) as body:
+            received = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                received += len(chunk)
+                if self._too_large(received):
+                    # Chunked, or more than it declared: stop reading here
+                    await too_large(send)
+                    return
+                body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            # Stop streaming as soon as the client goes away
+            disconnected = asyncio.Event()
+
+            async def watch_disconnect():
+                while (await receive())['type'] != 'http.disconnect':
+                    pass
+                disconnected.set()
+
+            watcher = asyncio.create_task(watch_disconnect())
+            response = WsgiResponse(self.wsgi_app, environ(scope, body))
+            try:
+                start = await loop.run_in_executor(self.executor, response.start)
+                await send(start)
+                while not disconnected.is_set():
+                    data = await loop.run_in_executor(self.executor, response.read, BATCH_SIZE)
+                    if not data:
+                        break
+                    await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+                if not disconnected.is_set():
+                    await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                watcher.cancel()
+                await loop.run_in_executor(self.executor, response.close)
+
+
+async def too_large(send):
+    """Answer 413 without reading the rest of the request body"""
+    body = b'Request Entity Too Large'
+    await send({
+        'type': 'http.response.start',
+        'status': 413,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8'),
+                    (b'content-length', str(len(body)).encode()),
+                    (b'connection', b'close')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class WsgiResponse:
+    """One call of a WSGI application, consumed a batch at a time"""
+
+    def __init__(self, wsgi_app, environ):
+        self.wsgi_app = wsgi_app
+        self.environ = environ
+        self.iterable = None
+        self.chunks = None
+        self.pending = b''
+        self.remaining = None
+
+    def start(self):
+        """Run the app up to its first body chunk; returns the ASGI response start message"""
+        status_headers = []
+
+        def start_response(status, headers, exc_info=None):
+            status_headers[:] = [status, headers]
+
+        self.iterable = self.wsgi_app(self.environ, start_response)
+        self.chunks = iter(self.iterable)
+        first = next(self.chunks, b'')
+        status, headers = status_headers
+        for name, value in headers:
+            if name.lower() == 'content-length':
+                self.remaining = int(value)
+        self.pending = first
+        return {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+        }
+
+    def read(self, size):
+        """Up to about ``size`` bytes of body; b'' when the body is complete"""
+        parts, total = [], 0
+        if self.pending:
+            parts.append(self.pending)
+            total = len(self.pending)
+            self.pending = b''
+        while total < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            total += len(chunk)
+        data = b''.join(parts)
+        if self.remaining is not None:
+            # Never send more than the declared Content-Length
+            data = data[:self.remaining]
+            self.remaining -= len(data)
+        return data
+
+    def close(self):
+        if hasattr(self.iterable, 'close'):
+            self.iterable.close()
+
+
+def environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope"""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    env = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,  # the whole body is buffered, chunked or not
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        env['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        if name in env:
+            value = env[name] + ('; ' if name == 'HTTP_COOKIE' else ',') + value
+        env[name] = value
+    return env
+
+
+flask_app = create_app(os.environ.get('FLASK_CONFIG', 'production'))
+app = AsgiAdapter(flask_app, flask_app.config['ASGI_THREADS'], flask_app.config['MAX_CONTENT_LENGTH'])
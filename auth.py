@@ -0,0 +1,81 @@
+"""Authorization and password policy helpers shared by the blueprints"""
+
+from functools import wraps
+from flask import abort, flash, redirect, request, url_for
+from flask_login import current_user
+
+
+def wants_json():
+    """True for requests handled by a JSON API blueprint"""
+    return (request.blueprint or '').startswith('api')
+
+
+def require_role(*roles):
+    """Decorator to require one of the given user roles.
+
+    HTML routes flash a message and redirect; API routes answer 401 or 403.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                if wants_json():
+                    abort(401)
+                flash('Please log in first.', 'danger')
+                return redirect(url_for('public.login'))
+            
+            if not any(current_user.has_role(role) for role in roles):
+                if wants_json():
+                    abort(403)
+                flash('You do not have permission to access this page.', 'danger')
+                return redirect(url_for('public.index'))
+            
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def evaluate_password_server(pw):
+    """Evaluate password strength on the server side. Returns (score, recommendations).
+    Score is normalized 0..4 (higher is better)."""
+    recommendations = []
+    score = 0
+    if not pw:
+        return 0, ["Enter a password"]
+
+    if len(pw) >= 8:
+        score += 1
+    else:
+        recommendations.append('Make it at least 8 characters long')
+
+    if len(pw) >= 12:
+        score += 1
+
+    if any(c.islower() for c in pw):
+        score += 1
+    else:
+        recommendations.append('Add lowercase letters')
+
+    if any(c.isupper() for c in pw):
+        score += 1
+    else:
+        recommendations.append('Add uppercase letters')
+
+    if any(c.isdigit() for c in pw):
+        score += 1
+    else:
+        recommendations.append('Add digits')
+
+    if any(not c.isalnum() for c in pw):
+        score += 1
+    else:
+        recommendations.append('Add special characters (e.g. !@#$%)')
+
+    lower = pw.lower()
+    common = ['password', '1234', 'qwerty', 'admin', 'letmein', 'iloveyou']
+    if any(c in lower for c in common):
+        recommendations.append('Avoid common words or sequences')
+        score = max(1, score - 2)
+
+    normalized = max(0, min(4, int(score / 1.5)))
+    return normalized, recommendations
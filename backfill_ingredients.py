@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+"""Parse the ingredients of existing recipes into the ingredient index"""
+
+from sqlalchemy import select
+from app import create_app
+from models import db, Recipe, index_recipe_ingredients
+
+BATCH_SIZE = 500
+
+def backfill_ingredients():
+    """Re-index every recipe's ingredients, one batch per transaction"""
+    app = create_app(with_routes=False)
+    with app.app_context():
+        print("Indexing recipe ingredients...")
+        last_id = 0
+        total = 0
+        while True:
+            with db.engine.begin() as connection:
+                rows = connection.execute(
+                    select(Recipe.id, Recipe.ingredients)
+                    .where(Recipe.id > last_id).order_by(Recipe.id).limit(BATCH_SIZE)
+                ).all()
+                for recipe_id, ingredients in rows:
+                    index_recipe_ingredients(connection, recipe_id, ingredients)
+            if not rows:
+                break
+            last_id = rows[-1].id
+            total += len(rows)
+            print(f"  {total} recipes indexed")
+        print("✅ Ingredient index rebuilt successfully!")
+
+if __name__ == '__main__':
+    backfill_ingredients()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Load test: how many concurrent slow connections a server can hold.
+
+Opens ``--slow`` connections that download a large file while reading it
+slowly, the way phones on poor networks do, then sends ``--probes`` quick
+requests and reports how many are answered and how fast. A server that ties
+a thread to each connection stops answering once the slow downloads use up
+its threads; one that serves them from an event loop keeps answering.
+
+Run the same test against both serving modes, e.g.
+
+    gunicorn -c gunicorn.conf.py wsgi:app            # WSGI, port 8000
+    uvicorn asgi:app --workers 2 --port 8001         # ASGI
+
+    python bench_concurrency.py http://127.0.0.1:8000 --slow-path /upload/<big file>
+    python bench_concurrency.py http://127.0.0.1:8001 --slow-path /upload/<big file>
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def request(host, port, path, read_body=True):
+    """Send a GET; returns (reader, writer, status) once the headers are in"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    if read_body:
+        await reader.read()
+        writer.close()
+    return reader, writer, int(status_line.split()[1]) if status_line else 0
+
+
+async def slow_download(host, port, path, hold, started):
+    """Download ``path`` at a trickle for ``hold`` seconds"""
+    try:
+        reader, writer, status = await request(host, port, path, read_body=False)
+    except OSError:
+        return
+    started.append(status)
+    deadline = time.monotonic() + hold
+    while time.monotonic() < deadline:
+        if not await reader.read(1024):
+            break
+        await asyncio.sleep(0.5)
+    writer.close()
+
+
+async def probe(host, port, path, timeout):
+    """Latency of one quick request in seconds, or None if it failed or timed out"""
+    start = time.monotonic()
+    try:
+        *_, status = await asyncio.wait_for(request(host, port, path), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    return time.monotonic() - start if status == 200 else None
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    started = []
+    downloads = [asyncio.create_task(slow_download(host, port, args.slow_path, args.hold, started))
+                 for _ in range(args.slow)]
+    await asyncio.sleep(args.ramp)
+
+    probes = await asyncio.gather(*(probe(host, port, args.probe_path, args.timeout)
+                                    for _ in range(args.probes)))
+    served = sorted(latency for latency in probes if latency is not None)
+
+    print(f"{args.url}")
+    print(f"  slow downloads started  {len(started)} / {args.slow}")
+    print(f"  probes answered         {len(served)} / {args.probes} within {args.timeout:.0f}s")
+    if served:
+        p95 = served[min(len(served) - 1, int(len(served) * 0.95))]
+        print(f"  probe latency           p50 {statistics.median(served) * 1000:.0f} ms, "
+              f"p95 {p95 * 1000:.0f} ms")
+    for task in downloads:
+        task.cancel()
+    await asyncio.gather(*downloads, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('url', help='server base URL, e.g. http://127.0.0.1:8000')
+    parser.add_argument('--slow-path', required=True, help='a large download, e.g. /upload/<file>')
+    parser.add_argument('--probe-path', default='/api/v1/recipes?per_page=5')
+    parser.add_argument('--slow', type=int, default=200, help='concurrent slow downloads')
+    parser.add_argument('--probes', type=int, default=50, help='quick requests sent meanwhile')
+    parser.add_argument('--hold', type=float, default=20, help='seconds each download is held open')
+    parser.add_argument('--ramp', type=float, default=3, help='seconds to wait before probing')
+    parser.add_argument('--timeout', type=float, default=10, help='seconds a probe may take')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Benchmark deleting a prolific account: ORM cascade vs set-based deletion.
+
+Seeds a scratch SQLite database with one user who owns ``--recipes`` recipes
+and wrote ``--comments`` comments (most on another user's recipes), then
+deletes that user from a fresh copy of the database both ways:
+
+    orm     load the user's rows and let the ORM cascade delete them one by one
+    bulk    models.delete_user_account(): one DELETE per table
+
+and reports the time until commit, the number of SQL statements, and any
+rows or counters the deletion got wrong.
+
+    python bench_delete_account.py [--recipes 10000] [--comments 100000]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix='bench-delete-')
+SEED_PATH = os.path.join(SCRATCH, 'seed.db')
+RUN_PATH = os.path.join(SCRATCH, 'run.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{RUN_PATH}'
+
+from sqlalchemy import event, insert
+from app import create_app
+from models import (db, User, Recipe, Comment, SharedFile, delete_user_account,
+                    index_recipe_ingredients, rebuild_recipe_fts, reconcile_counters)
+from jobs import release_all_later
+
+INGREDIENTS = '2 cups rice\n1 lb chicken breast\n3 tbsp peanuts'
+
+
+def seed(app, recipes, comments):
+    """Build the scratch database: 'prolific' (id 1) and 'other' (id 2)"""
+    with app.app_context():
+        db.create_all()
+        password_hash = '!'  # nobody logs in
+        db.session.execute(insert(User), [
+            {'id': 1, 'username': 'prolific', 'email': 'p@example.com', 'password_hash': password_hash},
+            {'id': 2, 'username': 'other', 'email': 'o@example.com', 'password_hash': password_hash},
+        ])
+        other_recipes = max(1, recipes // 10)
+        rows = [{'id': i + 1, 'title': f'Recipe {i}', 'description': 'd', 'ingredients': INGREDIENTS,
+                 'instructions': 'cook', 'difficulty': 'Easy',
+                 'image_filename': f'{i:064x}.jpg' if i % 10 == 0 else None,
+                 'user_id': 1 if i < recipes else 2}
+                for i in range(recipes + other_recipes)]
+        db.session.execute(insert(Recipe), rows)
+        # Most of the user's comments are on the other user's recipes, and the
+        # other user comments back on theirs
+        db.session.execute(insert(Comment), [
+            {'content': 'c', 'user_id': 1,
+             'recipe_id': recipes + 1 + i % other_recipes if i % 5 else 1 + i % recipes}
+            for i in range(comments)
+        ])
+        db.session.execute(insert(Comment), [
+            {'content': 'c', 'user_id': 2, 'recipe_id': 1 + i % recipes} for i in range(comments // 5)
+        ])
+        db.session.execute(insert(SharedFile), [
+            {'filename': f'{i:064x}.pdf', 'original_filename': 'x.pdf', 'user_id': 1} for i in range(100)
+        ])
+        connection = db.session.connection()
+        for row in rows:
+            index_recipe_ingredients(connection, row['id'], row['ingredients'])
+        rebuild_recipe_fts(connection)
+        db.session.commit()
+        reconcile_counters()
+        db.session.remove()
+        db.engine.dispose()
+    shutil.copy(RUN_PATH, SEED_PATH)
+
+
+def delete_orm(user):
+    """The account deletion route before set-based deletion"""
+    filenames = {file.filename for file in user.shared_files}
+    filenames.update(recipe.image_filename for recipe in user.recipes if recipe.image_filename)
+    db.session.delete(user)
+    release_all_later(filenames)
+
+
+def delete_bulk(user):
+    filenames, _ = delete_user_account(user)
+    release_all_later(filenames)
+
+
+def run(app, name, delete):
+    shutil.copy(SEED_PATH, RUN_PATH)
+    with app.app_context():
+        statements = []
+        listener = lambda *args: statements.append(1)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        start = time.perf_counter()
+        delete(db.session.get(User, 1))
+        db.session.commit()
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        left = (Recipe.query.filter_by(user_id=1).count() + Comment.query.filter_by(user_id=1).count()
+                + SharedFile.query.filter_by(user_id=1).count())
+        drifted = sum(reconcile_counters().values())
+        print(f"  {name:5s} {elapsed:8.2f} s {len(statements):9d} statements   "
+              f"{left} rows left behind, {drifted} counters off")
+        db.session.remove()
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=100000)
+    args = parser.parse_args()
+    app = create_app(with_routes=False)
+    try:
+        print(f"Seeding {args.recipes} recipes and {args.comments} comments...")
+        seed(app, args.recipes, args.comments)
+        run(app, 'orm', delete_orm)
+        run(app, 'bulk', delete_bulk)
+    finally:
+        shutil.rmtree(SCRATCH)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""Measure how long a fresh process takes to become ready to serve.
+
+Each phase runs in a new interpreter so nothing is already imported:
+
+    import      import app (the factory module)
+    create      create_app() with every blueprint registered
+    first       create_app() plus one request to the login page
+    script      create_app(with_routes=False), as maintenance scripts do
+
+    python bench_startup.py [runs]
+"""
+
+import statistics
+import subprocess
+import sys
+
+PHASES = {
+    'import': "import app",
+    'create': "from app import create_app; create_app()",
+    'first': "from app import create_app; create_app().test_client().get('/login')",
+    'script': "from app import create_app; create_app(with_routes=False)",
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+def run_phase(code):
+    """Seconds one fresh interpreter spends on ``code``"""
+    output = subprocess.run([sys.executable, '-c', TIMER.format(code=code)],
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def bench(runs):
+    print(f"Startup time, median of {runs} runs:")
+    for name, code in PHASES.items():
+        times = [run_phase(code) for _ in range(runs)]
+        print(f"  {name:8s} {statistics.median(times) * 1000:8.1f} ms   (min {min(times) * 1000:.1f} ms)")
+    print("✅ Done")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
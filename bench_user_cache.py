@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""Benchmark authenticated page views with and without the session-user cache.
+
+Seeds a scratch SQLite database with one logged-in user and their recipes,
+then requests each page ``--requests`` times through the test client with
+the session user loaded each of these ways:
+
+    uncached  db.session.get(User, id) on every request, as before the cache
+    simple    queries.get_user_cached() on the per-process LRU backend
+    sqlite    queries.get_user_cached() on the shared SQLite backend,
+              the production default
+
+and reports requests per second and SQL statements per request.
+
+    python bench_user_cache.py [--requests 2000]
+"""
+
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix='bench-user-cache-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(SCRATCH, 'app.db')}"
+
+from sqlalchemy import event
+from app import create_app, login_manager, load_user
+from cache import cache
+from models import db, User, Recipe
+from uploads import ingest_upload
+
+PASSWORD = 'Bench-passw0rd'
+PNG = b'\x89PNG\r\n\x1a\n' + b'pixels' * 1000
+
+
+def seed(app):
+    """One user with a page of recipes and a recipe image; returns the image filename"""
+    image = ingest_upload(io.BytesIO(PNG), 'png', app.config['UPLOAD_FOLDER'])
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', role='user')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([
+            Recipe(title=f'Recipe {i}', description='d', ingredients='1 egg', instructions='Boil.',
+                   image_filename=image.filename if i == 0 else None, user_id=user.id)
+            for i in range(12)
+        ])
+        db.session.commit()
+        db.session.remove()
+    return image.filename
+
+
+def load_uncached(user_id):
+    """The session loader before the cache"""
+    return db.session.get(User, int(user_id))
+
+
+def use_loader(app, mode):
+    """Switch the session user loader and the cache backend to ``mode``"""
+    login_manager.user_loader(load_uncached if mode == 'uncached' else load_user)
+    app.config['CACHE_TYPE'] = 'sqlite' if mode == 'sqlite' else 'simple'
+    cache.init_app(app)
+
+
+def run(app, mode, pages, requests):
+    """Time ``requests`` GETs of each page (name -> URL) as the logged-in user"""
+    use_loader(app, mode)
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': PASSWORD})
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        for name, page in pages.items():
+            client.get(page)  # warm up
+            statements.clear()
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = client.get(page)
+                assert response.status_code == 200, f"{page}: {response.status_code}"
+            elapsed = time.perf_counter() - start
+            print(f"  {mode:8s} {name:16s} {requests / elapsed:8.0f} req/s "
+                  f"{len(statements) / requests:6.2f} statements/request")
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    app = create_app()
+    app.config.update(UPLOAD_FOLDER=os.path.join(SCRATCH, 'uploads'),
+                      CACHE_SQLITE_PATH=os.path.join(SCRATCH, 'cache.db'),
+                      WTF_CSRF_ENABLED=False)  # the test client posts the login form
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    try:
+        image = seed(app)
+        pages = {'/profile': '/profile', '/my-recipes': '/my-recipes', '/recipe/1': '/recipe/1',
+                 '/upload/<image>': f'/upload/{image}'}
+        print(f"{args.requests} requests per page as a logged-in user:")
+        for mode in ('uncached', 'simple', 'sqlite'):
+            run(app, mode, pages, args.requests)
+        print("✅ Done")
+    finally:
+        shutil.rmtree(SCRATCH)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Rendered page and fragment cache.
+
+Anonymous traffic dominates and recipes change rarely, so listing pages and
+recipe details are cached as rendered HTML. The backend is chosen by
+``CACHE_TYPE``:
+
+- ``simple``: in-process LRU with per-entry TTL (default in development).
+  Each worker process has its own copy, so other workers may serve a stale
+  page, or a deleted account, until the TTL runs out.
+- ``redis``: shared across processes and hosts; needs the ``redis`` package.
+- ``sqlite``: shared across processes on one host through a local SQLite
+  file; a stand-in for redis in development and single-host deployments
+  (default in production).
+- ``null``: caching disabled.
+
+Whole groups of keys are invalidated with generation counters: a listing key
+embeds the current generation, and bumping it orphans every page at once.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class NullCache:
+    """Cache backend that stores nothing"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def get_counter(self, key):
+        return 0
+
+
+class LRUCache:
+    """In-process least-recently-used cache with per-entry expiry"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires at, value)
+        self._counters = {}  # never evicted, so generations cannot go back
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+
+class RedisCache:
+    """Shared cache on a redis server"""
+
+    def __init__(self, url, prefix='recipe-share:'):
+        import redis  # optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self._client.incr(self.prefix + key)
+
+    def get_counter(self, key):
+        value = self._client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+
+class SQLiteCache:
+    """Cache shared by all processes on one host through a SQLite file"""
+
+    PURGE_EVERY = 256  # writes between sweeps of expired entries
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._execute("CREATE TABLE IF NOT EXISTS cache "
+                      "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)")
+        self._execute("CREATE TABLE IF NOT EXISTS counters "
+                      "(key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _execute(self, sql, params=()):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn.execute(sql, params)
+
+    def get(self, key):
+        row = self._execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        expires = time.time() + ttl if ttl else None
+        self._execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                      (key, pickle.dumps(value), expires))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def delete(self, key):
+        self._execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key):
+        self._execute("INSERT INTO counters (key, value) VALUES (?, 1) "
+                      "ON CONFLICT(key) DO UPDATE SET value = value + 1", (key,))
+        return self.get_counter(key)
+
+    def get_counter(self, key):
+        row = self._execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+
+class Cache:
+    """Application cache: a configured backend plus generation counters"""
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.default_ttl = 300
+
+    def init_app(self, app):
+        """Create the backend selected by app.config['CACHE_TYPE']"""
+        cache_type = app.config['CACHE_TYPE']
+        self.default_ttl = app.config['CACHE_DEFAULT_TIMEOUT']
+        if cache_type == 'simple':
+            self.backend = LRUCache(app.config['CACHE_THRESHOLD'])
+        elif cache_type == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        elif cache_type == 'sqlite':
+            self.backend = SQLiteCache(app.config['CACHE_SQLITE_PATH'])
+        elif cache_type == 'null':
+            self.backend = NullCache()
+        else:
+            raise ValueError(f"Unknown CACHE_TYPE: {cache_type}")
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.backend.delete(key)
+
+    def generation(self, name):
+        """Current generation of a key group"""
+        return self.backend.get_counter('gen:' + name)
+
+    def bump(self, name):
+        """Invalidate every key built with the current generation of a group"""
+        self.backend.incr('gen:' + name)
+
+
+cache = Cache()
+
+
+def invalidate_recipe_listings():
+    """Drop every cached listing page"""
+    cache.bump('recipes')
+
+
+def invalidate_recipe(recipe_id):
+    """Drop the cached detail page and fragments of one recipe"""
+    cache.delete(f'recipe:{recipe_id}:anon', f'recipe-body:{recipe_id}')
+
+
+def invalidate_user(user_id):
+    """Drop the cached account state used by the session loader"""
+    cache.delete(f'user:{user_id}')
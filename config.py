@@ -4,14 +4,63 @@ from datetime import timedelta
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///recipe_app.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///recipe_app.db')  # primary
+    # Read replicas for GET-only pages, comma-separated URLs
+    SQLALCHEMY_REPLICA_URIS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_STICKY_SECONDS = 10  # reads stay on the primary this long after a client writes
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PRAGMAS = {'busy_timeout': 5000, 'foreign_keys': 'ON'}  # applied to every new SQLite connection
     
     # File upload settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'pdf', 'txt', 'jpg', 'jpeg', 'png', 'gif', 'doc', 'docx'}
     EMPLOYEE_ALLOWED_EXTENSIONS = {'pdf'}  # Employees can only share PDFs
+    UPLOAD_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # uploads are immutable; cache for a year
+    # How file bytes are sent: 'direct' (through Python), 'x-sendfile' or 'x-accel-redirect'
+    UPLOAD_DELIVERY_MODE = os.environ.get('UPLOAD_DELIVERY_MODE', 'direct')
+    UPLOAD_ACCEL_REDIRECT_PREFIX = '/_protected_uploads/'  # nginx internal location
+    # reconcile_uploads.py: unreferenced files younger than this are spared,
+    # older ones are moved here
+    UPLOAD_ORPHAN_GRACE_HOURS = 24
+    # Delete jobs: a file modified this recently may be reused by an upload
+    # that has not committed yet, so the job tries again after this long
+    UPLOAD_RELEASE_GRACE_SECONDS = 5 * 60
+    UPLOAD_QUARANTINE_FOLDER = os.path.join(os.path.dirname(__file__), 'instance', 'quarantine')
+    
+    COMMENTS_PER_PAGE = 20  # comments per batch on a recipe page
+    
+    # Password hashing (Argon2id cost parameters and worker pool)
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 3))
+    ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 65536))  # KiB
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 4))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASH_QUEUE_DEPTH', 16))  # waiting jobs
+    
+    # Page cache: 'simple' (per-process LRU), 'sqlite' (shared, one host), 'redis' or 'null'
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    CACHE_DEFAULT_TIMEOUT = 300  # seconds
+    CACHE_THRESHOLD = 1024  # max entries for 'simple'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_SQLITE_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'cache.db')
+    USER_CACHE_TTL = 60  # seconds a logged-in user's account row is reused
+    
+    # Login throttling: failure counters in 'memory' (per process) or 'redis' (shared)
+    LOCKOUT_STORE = os.environ.get('LOCKOUT_STORE', 'memory')
+    LOCKOUT_REDIS_URL = os.environ.get('LOCKOUT_REDIS_URL', CACHE_REDIS_URL)
+    LOGIN_RATE_LIMIT = 30  # failed logins per client address...
+    LOGIN_RATE_WINDOW = 300  # ...within this many seconds
+    
+    # ASGI mode (asgi.py): threads that run the Flask views for each process
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+    
+    # Background jobs (jobs.py, run by worker.py)
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+    JOB_POLL_INTERVAL = 1.0  # seconds an idle worker waits before looking again
+    JOB_TIMEOUT = 300  # seconds before a running job is presumed lost and requeued
+    JOB_BACKOFF_BASE = 5  # seconds before the first retry, doubled per attempt...
+    JOB_BACKOFF_MAX = 600  # ...up to this
+    JOB_RETENTION_DAYS = 7  # finished jobs are kept this long for inspection
     
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -27,9 +76,53 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
+    
+    # Shared by every worker process, so an account deleted or deactivated
+    # through one worker is logged out on all of them
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'sqlite')
+    
+    # SQLite tuned for concurrent readers and a single writer
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',        # readers never block the writer
+        'synchronous': 'NORMAL',      # safe with WAL, fsync only at checkpoints
+        'busy_timeout': 5000,         # wait up to 5s for the write lock
+        'cache_size': -64000,         # 64 MB page cache per connection
+        'mmap_size': 268435456,       # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',         # enforce references and ON DELETE CASCADE
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,               # writers queue on the SQLite lock anyway
+        'max_overflow': 0,
+        'pool_timeout': 10,
+    }
+    # Separate read-only connections to the same file
+    SQLALCHEMY_BINDS = {
+        'reader': {
+            'url': Config.SQLALCHEMY_DATABASE_URI,
+            'pool_size': 20,
+            'max_overflow': 10,
+            'pool_timeout': 10,
+        },
+    }
+
+class TestingConfig(Config):
+    """Test suite configuration; tests/conftest.py points it at a scratch folder"""
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SESSION_COOKIE_SECURE = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    CACHE_TYPE = 'simple'
+    LOCKOUT_STORE = 'memory'
+    UPLOAD_DELIVERY_MODE = 'direct'
+    # Cheap hashes: the tests check behaviour, not Argon2 cost
+    ARGON2_TIME_COST = 1
+    ARGON2_MEMORY_COST = 1024
+    ARGON2_PARALLELISM = 1
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
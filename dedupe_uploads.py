@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+"""Move existing uploads into the content-addressed store, merging duplicates"""
+
+from app import create_app
+from storage import dedupe_upload_folder
+
+def dedupe_uploads():
+    """Hash every legacy upload, store it once and repoint the rows using it"""
+    app = create_app(with_routes=False)
+    with app.app_context():
+        print(f"Deduplicating {app.config['UPLOAD_FOLDER']}...")
+        moved, duplicates = dedupe_upload_folder(app.config['UPLOAD_FOLDER'])
+        print(f"✅ Done: {moved} files moved, {duplicates} duplicates removed")
+
+if __name__ == '__main__':
+    dedupe_uploads()
@@ -0,0 +1,115 @@
+"""Employee pages: sharing recipe PDFs and managing them"""
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash
+from flask_login import current_user
+from models import db, replica_reads, SharedFile, UserRole
+from queries import active_shared_files_query
+from pagination import CursorPagination
+from auth import require_role
+from uploads import send_upload, secure_upload_file
+from storage import blob_path
+from jobs import release_later
+
+employee = Blueprint('employee', __name__, url_prefix='/employee')
+
+@employee.route('/dashboard')
+@replica_reads
+@require_role(UserRole.EMPLOYEE.value)
+def dashboard():
+    """Employee dashboard"""
+    files_count = SharedFile.query.filter_by(user_id=current_user.id, is_active=True).count()
+    return render_template('employee_dashboard.html', files_count=files_count)
+
+@employee.route('/share-file', methods=['GET', 'POST'])
+@require_role(UserRole.EMPLOYEE.value)
+def share_file():
+    """Employee can share PDF recipes"""
+    if request.method == 'POST':
+        description = request.form.get('description', '').strip()
+        
+        if 'file' not in request.files:
+            flash('No file selected.', 'danger')
+            return redirect(url_for('employee.share_file'))
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            flash('No file selected.', 'danger')
+            return redirect(url_for('employee.share_file'))
+        
+        try:
+            upload = secure_upload_file(file, is_employee=True)
+            
+            shared_file = SharedFile(
+                filename=upload.filename,
+                original_filename=file.filename,
+                description=description,
+                file_size=upload.size,
+                sha256=upload.sha256,
+                user_id=current_user.id
+            )
+            
+            db.session.add(shared_file)
+            db.session.commit()
+            
+            flash('Recipe PDF shared successfully!', 'success')
+            return redirect(url_for('employee.my_files'))
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('employee.share_file'))
+    
+    return render_template('share_file.html')
+
+@employee.route('/my-files')
+@replica_reads
+@require_role(UserRole.EMPLOYEE.value)
+def my_files():
+    """View employee's shared files"""
+    cursor = request.args.get('cursor')
+    shared_files = CursorPagination(active_shared_files_query(current_user.id), SharedFile,
+                                    cursor=cursor, per_page=10)
+    
+    return render_template('employee_my_files.html', shared_files=shared_files)
+
+@employee.route('/delete-file/<int:file_id>', methods=['POST'])
+@require_role(UserRole.EMPLOYEE.value)
+def delete_file(file_id):
+    """Delete shared file"""
+    shared_file = SharedFile.query.get_or_404(file_id)
+    
+    # Verify ownership
+    if shared_file.user_id != current_user.id:
+        flash('You do not have permission to delete this file.', 'danger')
+        return redirect(url_for('employee.my_files'))
+    
+    # Mark as inactive instead of deleting (for audit trail)
+    shared_file.is_active = False
+    # Delete actual file once nothing else references it
+    release_later(shared_file.filename)
+    db.session.commit()
+    
+    flash('Recipe PDF deleted successfully!', 'success')
+    return redirect(url_for('employee.my_files'))
+
+@employee.route('/download-file/<int:file_id>')
+@require_role(UserRole.EMPLOYEE.value)
+def download_file(file_id):
+    """Download own shared file"""
+    shared_file = SharedFile.query.get_or_404(file_id)
+    
+    # Verify ownership
+    if shared_file.user_id != current_user.id:
+        flash('You do not have permission to download this file.', 'danger')
+        return redirect(url_for('employee.my_files'))
+    
+    response = None
+    if shared_file.is_active:
+        file_path = blob_path(current_app.config['UPLOAD_FOLDER'], shared_file.filename)
+        response = send_upload(file_path, download_name=shared_file.original_filename,
+                               as_attachment=True, public=False)
+    
+    if response is None:
+        flash('File not found.', 'danger')
+        return redirect(url_for('employee.my_files'))
+    
+    return response
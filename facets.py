@@ -0,0 +1,110 @@
+"""Filters and facet counts for the recipe listing.
+
+The home page can be narrowed by difficulty, maximum cooking time and
+servings, and shows next to each option how many recipes it would leave
+("Easy (12)", "Under 30 min (40)").
+
+Those counts come from a small facet cube: the number of recipes per
+(difficulty, time bucket, servings bucket) cell. The cube is built with one
+GROUP BY and cached under the 'recipes' cache generation, which every recipe
+write bumps, so the table is aggregated once per change instead of once per
+page view. Any combination of filters is then counted by summing cells.
+"""
+
+from collections import namedtuple
+from sqlalchemy import case, func
+from models import db, Recipe
+from cache import cache
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+# Maximum cooking time filters, in minutes
+TIME_LIMITS = (15, 30, 60)
+# Servings filter value -> (minimum, maximum or None)
+SERVING_RANGES = {'1-2': (1, 2), '3-4': (3, 4), '5+': (5, None)}
+
+Filters = namedtuple('Filters', ['difficulty', 'max_time', 'servings'])
+
+
+def parse_filters(args):
+    """Valid filters from the query string; unknown values are ignored"""
+    difficulty = args.get('difficulty')
+    max_time = args.get('max_time', type=int)
+    servings = args.get('servings')
+    return Filters(
+        difficulty if difficulty in DIFFICULTIES else None,
+        max_time if max_time in TIME_LIMITS else None,
+        servings if servings in SERVING_RANGES else None,
+    )
+
+
+def apply_filters(query, filters):
+    """Narrow a Recipe query to the selected filters"""
+    if filters.difficulty:
+        query = query.filter(Recipe.difficulty == filters.difficulty)
+    if filters.max_time:
+        query = query.filter(Recipe.cooking_time <= filters.max_time)
+    if filters.servings:
+        low, high = SERVING_RANGES[filters.servings]
+        query = query.filter(Recipe.servings >= low)
+        if high is not None:
+            query = query.filter(Recipe.servings <= high)
+    return query
+
+
+def _time_bucket():
+    """Smallest time limit a recipe fits under, NULL if none"""
+    return case(*[(Recipe.cooking_time <= limit, limit) for limit in TIME_LIMITS], else_=None)
+
+
+def _servings_bucket():
+    return case(*[
+        ((Recipe.servings >= low) & (Recipe.servings <= high) if high is not None else Recipe.servings >= low, name)
+        for name, (low, high) in SERVING_RANGES.items()
+    ], else_=None)
+
+
+def facet_cube():
+    """[(difficulty, time bucket, servings bucket, count)], cached until a recipe changes"""
+    key = f"facets:{cache.generation('recipes')}"
+    cube = cache.get(key)
+    if cube is None:
+        time_bucket, servings_bucket = _time_bucket(), _servings_bucket()
+        cube = [tuple(row) for row in db.session.query(
+            Recipe.difficulty, time_bucket, servings_bucket, func.count(Recipe.id)
+        ).group_by(Recipe.difficulty, time_bucket, servings_bucket)]
+        cache.set(key, cube)
+    return cube
+
+
+def _matches(cell, filters, skip=None):
+    difficulty, time_bucket, servings_bucket, _ = cell
+    if skip != 'difficulty' and filters.difficulty and difficulty != filters.difficulty:
+        return False
+    if skip != 'max_time' and filters.max_time and (time_bucket is None or time_bucket > filters.max_time):
+        return False
+    if skip != 'servings' and filters.servings and servings_bucket != filters.servings:
+        return False
+    return True
+
+
+def facet_counts(filters):
+    """Recipe counts for every option of every facet.
+
+    Each facet's counts apply the other facets' filters but not its own, so
+    they say how many recipes picking that option would show.
+    """
+    cube = facet_cube()
+
+    def count(facet, accept):
+        return sum(cell[3] for cell in cube if _matches(cell, filters, skip=facet) and accept(cell))
+
+    return {
+        'total': count(None, lambda cell: True),
+        'any': {facet: count(facet, lambda cell: True) for facet in Filters._fields},
+        'difficulty': {d: count('difficulty', lambda cell, d=d: cell[0] == d) for d in DIFFICULTIES},
+        'max_time': {
+            limit: count('max_time', lambda cell, limit=limit: cell[1] is not None and cell[1] <= limit)
+            for limit in TIME_LIMITS
+        },
+        'servings': {s: count('servings', lambda cell, s=s: cell[2] == s) for s in SERVING_RANGES},
+    }
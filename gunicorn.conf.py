@@ -0,0 +1,48 @@
+"""Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is created once in the master (preload_app) and forked into the
+workers, so imports and app setup are paid once and the workers share those
+memory pages. Workers are recycled after a jittered number of requests to
+bound memory growth. Every setting can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threads let a worker keep serving pages while a request waits on the
+# password hashing pool or the SQLite write lock
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))  # workers do not all restart at once
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Give each worker its own connections and thread pools.
+
+    Database connections, the SQLite cache connection and the password
+    hashing pool created in the master must not be shared across processes.
+    """
+    from flask import Flask
+    from models import db, password_hashing
+    from cache import cache
+    app = server.app.wsgi()
+    if not isinstance(app, Flask):
+        app = app.wsgi_app  # asgi:app wraps the Flask app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    cache.init_app(app)
+    password_hashing.init_app(app)
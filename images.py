@@ -0,0 +1,114 @@
+"""Resized derivatives of uploaded recipe images.
+
+Each uploaded image gets a set of width-bounded variants stored in the same
+directory as the original, named ``<name>_<variant>.<format>``, in WebP and
+in the original format. Variants are produced by a background job right
+after upload (see jobs.py); any that are missing (older uploads, a job still
+waiting for a worker) are generated on first request instead.
+"""
+
+import os
+import tempfile
+
+_pillow_modules = None
+
+# Variant name -> maximum width in pixels
+VARIANTS = {'thumb': 160, 'card': 480, 'full': 1280}
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
+
+# Pillow save format per file extension
+_PIL_FORMATS = {'jpg': 'JPEG', 'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}
+
+# Permissions open() would have given a new file; mkstemp() always uses 0600
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+def _pillow():
+    """(Image, ImageOps) from Pillow, imported on first use; None without Pillow"""
+    global _pillow_modules
+    if _pillow_modules is None:
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:  # Pillow is optional; originals are served instead
+            _pillow_modules = False
+        else:
+            _pillow_modules = (Image, ImageOps)
+    return _pillow_modules or None
+
+
+def is_image(filename):
+    """Check if an upload is an image we can derive variants from"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_formats(filename):
+    """Formats a variant of this image is available in: WebP and the original"""
+    return ('webp', filename.rsplit('.', 1)[1].lower())
+
+
+def variant_filename(filename, variant, fmt):
+    """Name of a variant file, e.g. ``<name>_card.webp``"""
+    return f"{filename.rsplit('.', 1)[0]}_{variant}.{fmt}"
+
+
+def _render_variant(source, target, width, fmt):
+    """Write one resized copy of ``source`` to ``target`` atomically"""
+    Image, ImageOps = _pillow()
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        if fmt in ('jpg', 'jpeg') and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        elif fmt == 'webp' and img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                img.save(tmp, _PIL_FORMATS[fmt], quality=82, optimize=True)
+            os.chmod(tmp_path, FILE_MODE)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def variant_path(source, variant, fmt):
+    """Path of a variant, in the same directory as its original"""
+    directory, filename = os.path.split(source)
+    return os.path.join(directory, variant_filename(filename, variant, fmt))
+
+
+def ensure_variant(source, variant, fmt):
+    """Return the path of a variant of the image at ``source``, generating it
+    if it does not exist yet.
+
+    Returns None if the original is missing or Pillow is not installed.
+    """
+    target = variant_path(source, variant, fmt)
+    if os.path.exists(target):
+        return target
+    if _pillow() is None or not os.path.exists(source):
+        return None
+    _render_variant(source, target, VARIANTS[variant], fmt)
+    return target
+
+
+def generate_variants(source):
+    """Generate every missing variant of an image"""
+    for variant in VARIANTS:
+        for fmt in variant_formats(source):
+            ensure_variant(source, variant, fmt)
+
+
+def delete_variants(source):
+    """Remove all derived variants of an image"""
+    if not source or not is_image(source):
+        return
+    for variant in VARIANTS:
+        for fmt in variant_formats(source):
+            path = variant_path(source, variant, fmt)
+            if os.path.exists(path):
+                os.remove(path)
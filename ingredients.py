@@ -0,0 +1,103 @@
+"""Parsing free-text ingredient lines into quantity, unit and name.
+
+Recipes keep their ingredients as the text the author typed, one per line
+("- 200g pasta", "1 1/2 cups chicken stock", "salt, to taste"). Each line is
+also parsed into a normalised ingredient name so recipes can be filtered by
+what they contain; see the ingredient index in models.py.
+"""
+
+import re
+from collections import namedtuple
+from fractions import Fraction
+
+ParsedIngredient = namedtuple('ParsedIngredient', ['quantity', 'unit', 'name', 'text'])
+
+# Canonical unit -> spellings accepted for it
+UNITS = {
+    'g': ('g', 'gram', 'grams', 'gr'),
+    'kg': ('kg', 'kilogram', 'kilograms'),
+    'mg': ('mg',),
+    'ml': ('ml', 'milliliter', 'milliliters', 'millilitre', 'millilitres'),
+    'l': ('l', 'liter', 'liters', 'litre', 'litres'),
+    'tsp': ('tsp', 'teaspoon', 'teaspoons', 'tsps'),
+    'tbsp': ('tbsp', 'tablespoon', 'tablespoons', 'tbsps', 'tbs'),
+    'cup': ('cup', 'cups', 'c'),
+    'oz': ('oz', 'ounce', 'ounces'),
+    'lb': ('lb', 'lbs', 'pound', 'pounds'),
+    'pinch': ('pinch', 'pinches'),
+    'clove': ('clove', 'cloves'),
+    'slice': ('slice', 'slices'),
+    'can': ('can', 'cans', 'tin', 'tins'),
+    'piece': ('piece', 'pieces', 'pc', 'pcs'),
+}
+_UNIT_ALIASES = {alias: unit for unit, aliases in UNITS.items() for alias in aliases}
+
+_UNICODE_FRACTIONS = {'¼': '1/4', '½': '1/2', '¾': '3/4', '⅓': '1/3', '⅔': '2/3', '⅛': '1/8'}
+# "1", "1.5", "1,5", "1/2", "1 1/2", optionally a range "2-3" (the lower bound is kept)
+_QUANTITY = re.compile(r'^(\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)(?:\s*(?:-|to)\s*[\d./]+)?\s*')
+_BULLET = re.compile(r'^\s*(?:[-*•]|\d+[.)](?=\s))\s*')
+# Words dropped from names so "2 large ripe tomatoes" and "tomato" match
+_DESCRIPTORS = {
+    'of', 'a', 'an', 'the', 'fresh', 'large', 'small', 'medium', 'ripe', 'chopped', 'diced',
+    'sliced', 'minced', 'grated', 'ground', 'whole', 'boneless', 'skinless', 'finely', 'roughly',
+}
+
+
+def _parse_quantity(value):
+    total = Fraction(0)
+    for part in value.replace(',', '.').split():
+        total += Fraction(part)
+    return float(total)
+
+
+def _singular(word):
+    if len(word) > 3 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalise_name(text):
+    """Lowercase, drop descriptors and trailing notes, singularise each word"""
+    text = re.sub(r'\([^)]*\)', ' ', text.lower())
+    text = re.split(r'[,;(]| - | to taste| for ', text, maxsplit=1)[0]
+    words = [_singular(w) for w in re.findall(r"[a-z][a-z'-]*", text) if w not in _DESCRIPTORS]
+    return ' '.join(words)
+
+
+def parse_ingredient_line(line):
+    """Parse one ingredient line; returns None for blank lines and headings"""
+    text = _BULLET.sub('', line).strip()
+    if not text or text.endswith(':'):
+        return None
+    rest = text
+    for symbol, fraction in _UNICODE_FRACTIONS.items():
+        rest = rest.replace(symbol, ' ' + fraction)
+    rest = rest.strip()
+
+    quantity = unit = None
+    match = _QUANTITY.match(rest)
+    if match:
+        try:
+            quantity = _parse_quantity(match.group(1))
+        except (ValueError, ZeroDivisionError):
+            quantity = None
+        rest = rest[match.end():]
+        word = re.match(r'([A-Za-z]+)\.?(?:\s+|$)', rest)
+        if word and word.group(1).lower() in _UNIT_ALIASES:
+            unit = _UNIT_ALIASES[word.group(1).lower()]
+            rest = rest[word.end():]
+
+    name = normalise_name(rest)
+    if not name:
+        return None
+    return ParsedIngredient(quantity, unit, name, text[:255])
+
+
+def parse_ingredients(text):
+    """Parse every line of a recipe's ingredients field"""
+    parsed = (parse_ingredient_line(line) for line in (text or '').splitlines())
+    return [item for item in parsed if item is not None]
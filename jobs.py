@@ -0,0 +1,332 @@
+"""Background jobs for the deferred side effects of writes.
+
+Deleting an upload from disk or rendering image variants does not need to
+finish before the user gets a response. Routes enqueue a job instead, in the
+same transaction as the write that causes it, so the job exists exactly when
+the write committed. Worker processes (``python worker.py``) claim due jobs
+from the ``job`` table, run them, and retry failures with exponential
+backoff until the task's ``max_attempts`` is used up.
+
+A job may run more than once (a worker can die after the work but before
+recording it), so every task must be idempotent. Enqueueing with a ``key``
+coalesces duplicates: while a job with that key is still queued, enqueueing
+it again adds nothing.
+
+Cache invalidation stays inline in the routes: it is cheap, the user must
+see their own change on the next page, and the default per-process cache
+could not be reached from a worker process anyway.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select, update
+from models import db, Job, JobStatus
+from storage import blob_path, modified_within, release_blob
+from images import generate_variants, is_image
+
+logger = logging.getLogger(__name__)
+
+Task = namedtuple('Task', ['name', 'fn', 'max_attempts'])
+TASKS = {}
+
+RELEASE_BATCH = 500  # files per release_blobs job
+
+
+def task(name, max_attempts=5):
+    """Register a function as the task ``name``; it is called with the job payload as keyword arguments"""
+    def register(fn):
+        TASKS[name] = Task(name, fn, max_attempts)
+        return fn
+    return register
+
+
+def _insert(dialect_name):
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def enqueue(task_name, key=None, delay=0, **payload):
+    """Add a job to the current transaction; it is committed or rolled back with it.
+
+    With a ``key``, nothing is added while a job with the same key is queued.
+    """
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task: {task_name}")
+    now = datetime.now()
+    insert = _insert(db.session.get_bind(mapper=Job.__mapper__).dialect.name)
+    statement = insert(Job).values(
+        task=task_name,
+        payload=json.dumps(payload, sort_keys=True),
+        key=key,
+        status=JobStatus.QUEUED.value,
+        attempts=0,
+        max_attempts=TASKS[task_name].max_attempts,
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+    )
+    if key is not None:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=['key'], index_where=Job.status == JobStatus.QUEUED.value)
+    db.session.execute(statement)
+
+
+def next_due_job_id(now=None):
+    """Id of the queued job that is due first, or None"""
+    return db.session.scalar(
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED.value, Job.run_at <= (now or datetime.now()))
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+    )
+
+
+def _queued_keys():
+    return set(db.session.scalars(
+        select(Job.key).where(Job.status == JobStatus.QUEUED.value, Job.key.isnot(None))))
+
+
+def retry_failed():
+    """Requeue failed jobs with fresh attempts; returns how many.
+
+    A failed job is skipped if a job with its key is already queued.
+    """
+    queued_keys = _queued_keys()
+    requeued = 0
+    for job in Job.query.filter_by(status=JobStatus.FAILED.value).order_by(Job.id.desc()):
+        if job.key is not None:
+            if job.key in queued_keys:
+                continue
+            queued_keys.add(job.key)
+        job.status = JobStatus.QUEUED.value
+        job.attempts = 0
+        job.run_at = datetime.now()
+        job.finished_at = None
+        requeued += 1
+    db.session.commit()
+    return requeued
+
+
+def backoff(attempts, base, cap):
+    """Seconds before retry number ``attempts``: exponential, capped, with jitter"""
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class Worker:
+    """Claims and runs due jobs.
+
+    ``run()`` polls until stopped, on ``threads`` threads; ``drain()`` runs
+    every due job on the calling thread and returns, for scripts and tests
+    that want the queue empty before they look at the results.
+    """
+
+    def __init__(self, app, threads=None, name=None):
+        self.app = app
+        self.threads = threads or app.config['JOB_WORKER_THREADS']
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.stopping = threading.Event()
+        self._threads = []
+
+    def claim(self):
+        """Mark the next due job as running by this worker; returns it or None"""
+        now = datetime.now()
+        while True:
+            job_id = next_due_job_id(now)
+            if job_id is None:
+                db.session.commit()
+                return None
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+                .values(status=JobStatus.RUNNING.value, locked_at=now,
+                        locked_by=f'{self.name}/{threading.current_thread().name}',
+                        attempts=Job.attempts + 1)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id)
+            # Another worker claimed it first; try the next one
+
+    def execute(self, job):
+        """Run a claimed job and record the outcome"""
+        job_id = job.id
+        start = time.perf_counter()
+        try:
+            registered = TASKS.get(job.task)
+            if registered is None:
+                raise LookupError(f"Unknown task: {job.task}")
+            registered.fn(**json.loads(job.payload))
+        except Exception as error:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.last_error = f'{type(error).__name__}: {error}'[:2000]
+            job.locked_at = job.locked_by = None
+            if job.attempts >= job.max_attempts:
+                job.status = JobStatus.FAILED.value
+                job.finished_at = datetime.now()
+                logger.error("Job %s (%s) failed for good: %s", job_id, job.task, job.last_error)
+            else:
+                job.status = JobStatus.QUEUED.value
+                job.run_at = datetime.now() + timedelta(seconds=backoff(
+                    job.attempts, self.app.config['JOB_BACKOFF_BASE'], self.app.config['JOB_BACKOFF_MAX']))
+                logger.warning("Job %s (%s) attempt %s failed, retrying at %s: %s",
+                               job_id, job.task, job.attempts, job.run_at, job.last_error)
+        else:
+            job = db.session.get(Job, job_id)
+            job.status = JobStatus.DONE.value
+            job.finished_at = datetime.now()
+            job.last_error = None
+            logger.info("Job %s (%s) done in %.0f ms", job_id, job.task, (time.perf_counter() - start) * 1000)
+        db.session.commit()
+
+    def run_one(self):
+        """Claim and run one due job; False if none was due"""
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def drain(self):
+        """Run due jobs until none is left; returns how many ran"""
+        count = 0
+        with self.app.app_context():
+            while self.run_one():
+                count += 1
+        return count
+
+    def recover(self):
+        """Requeue jobs whose worker stopped responding mid-run.
+
+        A running job older than JOB_TIMEOUT is presumed lost. It goes back
+        to the queue, unless it has no attempts left or a job with the same
+        key is already queued to do the same work.
+        """
+        cutoff = datetime.now() - timedelta(seconds=self.app.config['JOB_TIMEOUT'])
+        stale = (Job.query.filter(Job.status == JobStatus.RUNNING.value, Job.locked_at < cutoff)
+                 .order_by(Job.id.desc()).all())
+        queued_keys = _queued_keys() if stale else set()
+        for job in stale:
+            job.locked_at = job.locked_by = None
+            if job.attempts >= job.max_attempts or job.key in queued_keys:
+                job.status = JobStatus.FAILED.value
+                job.finished_at = datetime.now()
+                job.last_error = 'Worker stopped responding'
+            else:
+                job.status = JobStatus.QUEUED.value
+                job.run_at = datetime.now()
+                if job.key is not None:
+                    queued_keys.add(job.key)
+        db.session.commit()
+
+    def purge(self):
+        """Delete finished jobs older than JOB_RETENTION_DAYS"""
+        cutoff = datetime.now() - timedelta(days=self.app.config['JOB_RETENTION_DAYS'])
+        db.session.execute(delete(Job).where(
+            Job.status.in_([JobStatus.DONE.value, JobStatus.FAILED.value]), Job.finished_at < cutoff))
+        db.session.commit()
+
+    def _loop(self, housekeeping):
+        with self.app.app_context():
+            last_housekeeping = 0
+            while not self.stopping.is_set():
+                try:
+                    if housekeeping and time.monotonic() - last_housekeeping > self.app.config['JOB_TIMEOUT'] / 2:
+                        self.recover()
+                        self.purge()
+                        last_housekeeping = time.monotonic()
+                    if not self.run_one():
+                        self.stopping.wait(self.poll_interval)
+                except Exception:
+                    # A database hiccup must not kill the worker thread
+                    logger.exception("Job worker error")
+                    db.session.rollback()
+                    self.stopping.wait(self.poll_interval)
+                finally:
+                    db.session.remove()
+
+    def start(self):
+        """Start the worker threads in the background"""
+        self.stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(i == 0,), name=f'job-worker-{i}', daemon=True)
+            for i in range(self.threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the threads to stop after their current job and wait for them"""
+        self.stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run(self):
+        """Run until stop() is called or the process is interrupted"""
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                for thread in self._threads:
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+
+
+# ==================== TASKS ====================
+
+def _release(filename):
+    """Release a stored file; one modified within the release grace is tried again after it"""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    grace = current_app.config['UPLOAD_RELEASE_GRACE_SECONDS']
+    if (not release_blob(upload_folder, filename, grace)
+            and modified_within(blob_path(upload_folder, filename), grace)):
+        release_later(filename, delay=grace)
+
+
+@task('release_blob')
+def _release_blob(filename):
+    """Delete a stored file once no recipe or shared file references it"""
+    _release(filename)
+
+
+@task('release_blobs')
+def _release_blobs(filenames):
+    """Delete a batch of stored files, each once nothing references it"""
+    for filename in filenames:
+        _release(filename)
+
+
+@task('generate_variants', max_attempts=3)
+def _generate_variants(filename):
+    """Render the resized variants of an uploaded image"""
+    generate_variants(blob_path(current_app.config['UPLOAD_FOLDER'], filename))
+
+
+def release_later(filename, delay=0):
+    """Enqueue deleting a file that a committed write may have orphaned"""
+    if filename:
+        enqueue('release_blob', key=f'release_blob:{filename}', delay=delay, filename=filename)
+
+
+def release_all_later(filenames):
+    """Enqueue deleting many files at once, RELEASE_BATCH per job"""
+    filenames = sorted(filenames)
+    for start in range(0, len(filenames), RELEASE_BATCH):
+        enqueue('release_blobs', filenames=filenames[start:start + RELEASE_BATCH])
+
+
+def generate_variants_later(filename):
+    """Enqueue rendering the variants of a newly stored image"""
+    if filename and is_image(filename):
+        enqueue('generate_variants', key=f'generate_variants:{filename}', filename=filename)
@@ -0,0 +1,148 @@
+"""Login throttling: per-account lockout and per-address rate limiting.
+
+Failed logins are counted in a sliding-window counter store instead of being
+committed to the user row on every attempt, so the login path only writes to
+the database when an account's lockout state actually changes: when it
+reaches MAX_LOGIN_ATTEMPTS failures (and is locked for LOCKOUT_PERIOD) and on
+the first successful login after that. The store is chosen by
+``LOCKOUT_STORE``:
+
+- ``memory``: per-process counters (default). Each worker counts on its own,
+  so with N workers an attacker gets up to N times the attempts before the
+  lock, and counts below the limit are lost on restart. The lock itself is
+  persisted and holds across workers.
+- ``redis``: counters shared by every worker and host; needs the ``redis``
+  package.
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from models import MAX_LOGIN_ATTEMPTS, LOCKOUT_PERIOD
+
+
+class MemoryCounterStore:
+    """In-process sliding-window counters"""
+
+    SWEEP_EVERY = 1024  # hits between sweeps of idle keys
+
+    def __init__(self):
+        self._hits = {}  # key -> deque of (timestamp, window)
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def _prune(self, key, now):
+        hits = self._hits.get(key)
+        while hits and hits[0][0] <= now - hits[0][1]:
+            hits.popleft()
+        if hits is not None and not hits:
+            del self._hits[key]
+            return None
+        return hits
+
+    def hit(self, key, window):
+        """Record an event and return the number of events in the window"""
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                for stale in list(self._hits):
+                    self._prune(stale, now)
+            hits = self._prune(key, now)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            hits.append((now, window))
+            return len(hits)
+
+    def count(self, key, window):
+        """Number of events in the last ``window`` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            return sum(1 for timestamp, _ in hits if timestamp > now - window) if hits else 0
+
+    def clear(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class RedisCounterStore:
+    """Sliding-window counters in redis sorted sets, shared by all workers"""
+
+    def __init__(self, url, prefix='recipe-share:throttle:'):
+        import redis  # optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def hit(self, key, window):
+        """Record an event and return the number of events in the window"""
+        key = self.prefix + key
+        now = time.time()
+        pipe = self._client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zadd(key, {uuid.uuid4().hex: now})
+        pipe.zcard(key)
+        pipe.expire(key, int(window) + 1)
+        return pipe.execute()[2]
+
+    def count(self, key, window):
+        """Number of events in the last ``window`` seconds.
+
+        Entries are only trimmed by hit(), so older ones may still be in the
+        set; count by score instead of taking its size.
+        """
+        return self._client.zcount(self.prefix + key, f'({time.time() - window}', '+inf')
+
+    def clear(self, key):
+        self._client.delete(self.prefix + key)
+
+
+class LoginThrottle:
+    """Tracks failed logins per account and per client address"""
+
+    def __init__(self):
+        self.store = MemoryCounterStore()
+        self.address_limit = 30
+        self.address_window = 300
+
+    def init_app(self, app):
+        """Create the counter store selected by app.config['LOCKOUT_STORE']"""
+        store = app.config['LOCKOUT_STORE']
+        if store == 'memory':
+            self.store = MemoryCounterStore()
+        elif store == 'redis':
+            self.store = RedisCounterStore(app.config['LOCKOUT_REDIS_URL'])
+        else:
+            raise ValueError(f"Unknown LOCKOUT_STORE: {store}")
+        self.address_limit = app.config['LOGIN_RATE_LIMIT']
+        self.address_window = app.config['LOGIN_RATE_WINDOW']
+
+    def address_blocked(self, address):
+        """True if this client address has failed too many logins recently"""
+        return self.store.count(f'address:{address}', self.address_window) >= self.address_limit
+
+    def record_failure(self, address, user=None):
+        """Count a failed login; returns the attempts ``user`` has left.
+
+        The failure that uses up the last attempt locks the account on the
+        user row; the caller commits. Returns None when there is no user.
+        """
+        self.store.hit(f'address:{address}', self.address_window)
+        if user is None:
+            return None
+        key = f'user:{user.id}'
+        failures = self.store.hit(key, LOCKOUT_PERIOD.total_seconds())
+        if failures < MAX_LOGIN_ATTEMPTS:
+            return MAX_LOGIN_ATTEMPTS - failures
+        user.lock_login(failures)
+        self.store.clear(key)  # start afresh once the lock expires
+        return 0
+
+    def record_success(self, user):
+        """Forget an account's failures; clears a persisted lockout if any"""
+        self.store.clear(f'user:{user.id}')
+        user.reset_login_attempts()
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""Upgrade the database schema and check the query plans of the app's routes.
+
+    python migrate.py              apply pending migrations
+    python migrate.py current      show the applied version
+    python migrate.py history      list every migration
+    python migrate.py stamp [N]    mark migrations up to N as applied
+    python migrate.py check        EXPLAIN QUERY PLAN every route query
+"""
+
+import sys
+from datetime import datetime
+from sqlalchemy import event
+from app import create_app
+from models import db, Recipe, Comment, SharedFile, User, delete_user_account
+from migrations import MIGRATIONS, head, current_version, upgrade, stamp
+from pagination import CursorPagination, encode_cursor
+from queries import (recipe_listing_query, user_recipes_query, recipe_comments_query,
+                     active_shared_files_query, employees_query, recipes_by_ingredients,
+                     recipes_by_ids)
+from storage import reference_count
+from facets import Filters, apply_filters
+from jobs import next_due_job_id
+
+def delete_account_rolled_back():
+    """Run the account deletion statements without keeping their effect"""
+    try:
+        delete_user_account(User(id=1, role='user'))
+    finally:
+        db.session.rollback()
+
+def route_queries():
+    """(route, callable) pairs that run the queries behind each route.
+
+    Listings are run from a cursor, so the keyset filter is part of the plan.
+    """
+    cursor = encode_cursor(['n', datetime.now().isoformat(), 2 ** 31])
+    def page(query, model, per_page=10):
+        return lambda: CursorPagination(query, model, cursor=cursor, per_page=per_page)
+    return [
+        ('index', page(recipe_listing_query(), Recipe, 6)),
+        ('index filtered', page(apply_filters(recipe_listing_query(), Filters('Easy', 30, None)), Recipe, 6)),
+        ('my_recipes', page(user_recipes_query(1), Recipe, 6)),
+        ('view_recipe comments', page(recipe_comments_query(1), Comment, 20)),
+        ('admin_view_shared_files', page(active_shared_files_query(), SharedFile)),
+        ('employee_my_files', page(active_shared_files_query(1), SharedFile)),
+        ('employee_dashboard', lambda: SharedFile.query.filter_by(user_id=1, is_active=True).count()),
+        ('admin_dashboard', lambda: employees_query().all()),
+        ('login', lambda: User.query.filter_by(username='demo').first()),
+        ('register', lambda: User.query.filter_by(email='demo@example.com').first()),
+        ('delete_account', delete_account_rolled_back),
+        ('upload references', lambda: reference_count('0' * 64 + '.jpg')),
+        ('api_v1 recipes by ingredients',
+         lambda: recipes_by_ingredients(['rice', 'chicken'], ['peanut'], cursor=encode_cursor([2 ** 31]))),
+        ('api_v1 recipes by ids', lambda: recipes_by_ids([3, 1, 2])),
+        ('worker claim', next_due_job_id),
+    ]
+
+# Tables a route may scan: the ingredient vocabulary only holds distinct
+# names and is scanned to match whole words inside them
+SCAN_ALLOWED = {'ingredient'}
+
+def full_scans(plan):
+    """Plan lines that read a whole table or sort it.
+
+    Scanning a subquery the plan has just materialized reads only its
+    result, not a table, so it is allowed.
+    """
+    materialized = {line.split()[1] for line in plan if line.startswith('MATERIALIZE ')}
+    return [
+        line for line in plan
+        if (line.startswith('SCAN ') and ' USING ' not in line and 'VIRTUAL TABLE' not in line
+            and line.split()[1] not in SCAN_ALLOWED | materialized)
+        or line.startswith('USE TEMP B-TREE FOR ORDER BY')
+    ]
+
+def query_plans():
+    """(route, plan lines) for every statement the route queries run.
+
+    Needs an app context on a SQLite database.
+    """
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    plans = []
+    engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        for name, run in route_queries():
+            del statements[:]
+            run()
+            for statement, parameters in list(statements):
+                with db.engine.connect() as connection:
+                    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                plans.append((name, [row[-1] for row in rows]))
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+    return plans
+
+def check_query_plans():
+    """Print the plan of every route query; return False if any does a full scan"""
+    ok = True
+    app = create_app(with_routes=False)
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print("❌ Plan checks need SQLite's EXPLAIN QUERY PLAN.")
+            return False
+        for name, plan in query_plans():
+            bad = full_scans(plan)
+            ok = ok and not bad
+            print(f"{'❌' if bad else '✅'} {name}")
+            for line in plan:
+                print(f"     {line}")
+    return ok
+
+def main(argv):
+    command = argv[0] if argv else 'upgrade'
+    app = create_app(with_routes=False)
+    with app.app_context():
+        if command == 'upgrade':
+            print("Applying migrations...")
+            applied = upgrade(db.engine)
+            print(f"✅ Database at version {head()} ({len(applied)} applied)")
+        elif command == 'current':
+            with db.engine.begin() as connection:
+                print(f"Version {current_version(connection)} of {head()}")
+        elif command == 'history':
+            for step in MIGRATIONS:
+                print(f"  {step.version:3d}  {step.description}")
+        elif command == 'stamp':
+            stamp(db.engine, int(argv[1]) if len(argv) > 1 else None)
+            print("✅ Database stamped")
+        elif command == 'check':
+            return 0 if check_query_plans() else 1
+        else:
+            print(__doc__)
+            return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
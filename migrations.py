@@ -0,0 +1,207 @@
+"""Versioned schema migrations.
+
+``db.create_all()`` only creates missing tables; it never adds a column or an
+index to a table that already exists. Each schema change since the first
+release is therefore a numbered step here, and the ``schema_version`` table
+records which steps a database has applied. ``upgrade()`` runs the missing
+ones in order, each in its own transaction.
+
+Steps check the live schema before changing it, so they are safe to run on a
+database that already has some of their changes (for example one created by
+a newer ``create_all()``). A freshly created database is stamped with the
+latest version instead, see ``create_database()``; ``prepare_database()``
+picks the right one.
+"""
+
+from collections import namedtuple
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateColumn
+from models import db, SchemaVersion, UserRole, Recipe, Job, index_recipe_ingredients, rebuild_recipe_fts
+
+Migration = namedtuple('Migration', ['version', 'description', 'apply'])
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration step; versions must be added in increasing order"""
+    def register(fn):
+        assert not MIGRATIONS or MIGRATIONS[-1].version < version, "migration versions must increase"
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return register
+
+
+def _add_column(connection, table, column):
+    """ALTER TABLE ... ADD COLUMN, using the column as declared in models.py"""
+    existing = {c['name'] for c in inspect(connection).get_columns(table)}
+    if column in existing:
+        return
+    ddl = CreateColumn(db.metadata.tables[table].c[column]).compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {ddl}'))
+
+
+def _create_index(connection, table, name):
+    """CREATE INDEX for an index declared in models.py, unless it exists"""
+    index = next(i for i in db.metadata.tables[table].indexes if i.name == name)
+    index.create(connection, checkfirst=True)
+
+
+@migration(1, "Upload content hashes and lookup indexes")
+def _upload_hashes(connection):
+    _add_column(connection, 'recipe', 'image_sha256')
+    _add_column(connection, 'shared_file', 'sha256')
+    _create_index(connection, 'recipe', 'ix_recipe_image_filename')
+    _create_index(connection, 'recipe', 'ix_recipe_created_at')
+    _create_index(connection, 'shared_file', 'ix_shared_file_filename')
+    _create_index(connection, 'shared_file', 'ix_shared_file_created_at')
+
+
+def _recipe_fts_incomplete(connection):
+    """True if the FTS index is missing or holds fewer rows than recipe.
+
+    ``create_all()`` creates an empty index next to existing recipes, so the
+    table existing is not enough.
+    """
+    if 'recipe_fts' not in inspect(connection).get_table_names():
+        return True
+    indexed = connection.execute(text('SELECT COUNT(*) FROM recipe_fts')).scalar()
+    return indexed < connection.execute(text('SELECT COUNT(*) FROM recipe')).scalar()
+
+
+@migration(2, "Recipe full-text search index")
+def _recipe_fts(connection):
+    if connection.dialect.name == 'sqlite' and _recipe_fts_incomplete(connection):
+        rebuild_recipe_fts(connection)
+
+
+@migration(3, "Maintained comment, recipe and role counters")
+def _counters(connection):
+    _add_column(connection, 'user', 'recipe_count')
+    _add_column(connection, 'user', 'comment_count')
+    _add_column(connection, 'recipe', 'comment_count')
+    db.metadata.tables['role_count'].create(connection, checkfirst=True)
+    connection.execute(text(
+        'UPDATE recipe SET comment_count = '
+        '(SELECT COUNT(*) FROM comment WHERE comment.recipe_id = recipe.id)'))
+    connection.execute(text(
+        'UPDATE "user" SET '
+        'recipe_count = (SELECT COUNT(*) FROM recipe WHERE recipe.user_id = "user".id), '
+        'comment_count = (SELECT COUNT(*) FROM comment WHERE comment.user_id = "user".id)'))
+    connection.execute(text('DELETE FROM role_count'))
+    connection.execute(text(
+        'INSERT INTO role_count (role, user_count) SELECT role, COUNT(*) FROM "user" GROUP BY role'))
+    for role in UserRole:
+        connection.execute(text(
+            'INSERT INTO role_count (role, user_count) SELECT :role, 0 '
+            'WHERE NOT EXISTS (SELECT 1 FROM role_count WHERE role = :role)'), {'role': role.value})
+
+
+@migration(4, "Index comments by (recipe_id, created_at)")
+def _comment_batches(connection):
+    _create_index(connection, 'comment', 'ix_comment_recipe_created')
+
+
+@migration(5, "Composite indexes for listing and filter queries")
+def _listing_indexes(connection):
+    _create_index(connection, 'recipe', 'ix_recipe_user_created')
+    _create_index(connection, 'comment', 'ix_comment_user_id')
+    _create_index(connection, 'shared_file', 'ix_shared_file_user_active_created')
+    _create_index(connection, 'shared_file', 'ix_shared_file_active_created')
+    _create_index(connection, 'user', 'ix_user_role')
+
+
+@migration(6, "Parsed ingredient index")
+def _ingredient_index(connection):
+    db.metadata.tables['ingredient'].create(connection, checkfirst=True)
+    db.metadata.tables['recipe_ingredient'].create(connection, checkfirst=True)
+    for recipe_id, ingredients in connection.execute(select(Recipe.id, Recipe.ingredients)).all():
+        index_recipe_ingredients(connection, recipe_id, ingredients)
+
+
+@migration(7, "Indexes for listing filters")
+def _filter_indexes(connection):
+    _create_index(connection, 'recipe', 'ix_recipe_difficulty_created')
+    _create_index(connection, 'recipe', 'ix_recipe_cooking_time')
+    _create_index(connection, 'recipe', 'ix_recipe_servings')
+
+
+@migration(8, "Background job queue")
+def _job_table(connection):
+    Job.__table__.create(connection, checkfirst=True)
+
+
+@migration(9, "Rebuild a recipe search index left empty by create_all()")
+def _recipe_fts_repair(connection):
+    _recipe_fts(connection)
+
+
+@migration(10, "Index shared files by (filename, is_active)")
+def _shared_file_references(connection):
+    _create_index(connection, 'shared_file', 'ix_shared_file_filename_active')
+
+
+def head():
+    """Latest migration version"""
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(connection):
+    """Highest migration applied to the database, 0 for an unversioned one"""
+    SchemaVersion.__table__.create(connection, checkfirst=True)
+    version = connection.execute(select(db.func.max(SchemaVersion.version))).scalar()
+    return version or 0
+
+
+def _record(connection, step):
+    connection.execute(SchemaVersion.__table__.insert().values(
+        version=step.version, description=step.description))
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply every migration newer than the database, up to ``target``.
+
+    Returns the versions applied.
+    """
+    target = head() if target is None else target
+    with engine.begin() as connection:
+        version = current_version(connection)
+    applied = []
+    for step in MIGRATIONS:
+        if version < step.version <= target:
+            log(f"  {step.version:3d}  {step.description}")
+            with engine.begin() as connection:
+                step.apply(connection)
+                _record(connection, step)
+            applied.append(step.version)
+    return applied
+
+
+def stamp(engine, version=None):
+    """Mark migrations up to ``version`` (default: all) as applied without running them"""
+    version = head() if version is None else version
+    with engine.begin() as connection:
+        done = current_version(connection)
+        for step in MIGRATIONS:
+            if done < step.version <= version:
+                _record(connection, step)
+
+
+def create_database():
+    """Create every table of an empty database and stamp it as up to date"""
+    db.create_all()
+    stamp(db.engine)
+
+
+def prepare_database(log=print):
+    """Bring the app's database up to date, whatever state it is in.
+
+    An empty database is created and stamped; an existing one is upgraded
+    first and only then gets any tables it still lacks, so ``create_all()``
+    never creates an empty table a migration would have filled.
+    """
+    if 'user' not in inspect(db.engine).get_table_names():
+        create_database()
+        return []
+    applied = upgrade(db.engine, log=log)
+    db.create_all()
+    return applied
@@ -1,14 +1,263 @@
+from flask import current_app, g, has_request_context, session as cookie_session
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import UserMixin
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+from sqlalchemy import delete, event, func, inspect, select, text, union, update
+from sqlalchemy.sql.elements import TextClause
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
+from functools import wraps
+from ingredients import parse_ingredients
+from threading import BoundedSemaphore, Lock
+import random
+import time
 
-# Initialize Argon2 password hasher
-pw_hasher = PasswordHasher()
+# Optional bind with read-only connections to the same database
+READER_BIND = 'reader'
+# Binds built from SQLALCHEMY_REPLICA_URIS are named replica_0, replica_1, ...
+REPLICA_BIND_PREFIX = 'replica_'
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """Session that sends reads to a read-only engine when one is configured.
+
+    SELECTs use the read-only engine until the session starts writing (a
+    flush or a bulk UPDATE/DELETE); from then until the transaction ends every
+    statement uses the default engine, so the transaction sees its own writes.
+    Sessions opened by a @replica_reads view read from one of the replicas,
+    others from the ``reader`` bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('writing') and _is_read(clause):
+            engine = self._read_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_engine(self):
+        engines = self._db.engines
+        if self.info.get('use_replica'):
+            # One replica per session, so a request sees a single snapshot
+            if 'replica' not in self.info:
+                replicas = [key for key in engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+                self.info['replica'] = random.choice(replicas) if replicas else None
+            if self.info['replica'] is not None:
+                return engines[self.info['replica']]
+        return engines.get(READER_BIND)
+
+def _is_read(clause):
+    """Whether a statement only reads"""
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return getattr(clause, 'is_select', False)
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _start_writing(session, flush_context, instances):
+    session.info['writing'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _start_writing_bulk(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['writing'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _note_write(session):
+    if session.info.get('writing') and has_request_context():
+        g.db_wrote = True
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _stop_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('writing', None)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def init_db(app):
+    """Set up Flask-SQLAlchemy with one bind per read replica.
+
+    Each URL in SQLALCHEMY_REPLICA_URIS becomes a ``replica_<n>`` bind used
+    only for reads in @replica_reads views. After a request commits a write,
+    the client's session cookie records the time, and for
+    REPLICA_STICKY_SECONDS its reads stay on the primary so it sees its own
+    changes despite replication lag.
+    """
+    replicas = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for number, url in enumerate(replicas):
+        binds[f'{REPLICA_BIND_PREFIX}{number}'] = url
+    app.config['SQLALCHEMY_BINDS'] = binds
+    db.init_app(app)
+    init_sqlite(app)
+
+    if replicas:
+        @app.after_request
+        def remember_write(response):
+            if g.pop('db_wrote', False):
+                cookie_session['db_write_at'] = time.time()
+            return response
+
+def replica_reads(view):
+    """Serve a GET-only view's reads from a replica, unless this client wrote recently"""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        last_write = cookie_session.get('db_write_at', 0)
+        if time.time() - last_write > current_app.config['REPLICA_STICKY_SECONDS']:
+            db.session.info['use_replica'] = True
+        return view(*args, **kwargs)
+    return decorated_function
+
+def init_sqlite(app):
+    """Tune SQLite connections for concurrent use.
+
+    Every new connection gets the pragmas in SQLITE_PRAGMAS (WAL, busy
+    timeout, cache sizes). Connections of the ``reader`` bind and of replicas
+    are made query-only. When a ``reader`` bind is configured, the writer
+    starts its transactions with BEGIN IMMEDIATE: the write lock is taken up
+    front, waiting up to busy_timeout, instead of failing with "database is
+    locked" when a read transaction later tries to upgrade.
+    """
+    with app.app_context():
+        engines = dict(db.engines)
+    split = READER_BIND in engines
+    for key, engine in engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+        pragmas = dict(app.config['SQLITE_PRAGMAS'])
+        if key == READER_BIND or (key or '').startswith(REPLICA_BIND_PREFIX):
+            pragmas['query_only'] = 'ON'
+        _install_sqlite_hooks(engine, pragmas, immediate=split and key is None)
+
+def _install_sqlite_hooks(engine, pragmas, immediate):
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        if immediate:
+            # Let SQLAlchemy's begin event below issue BEGIN itself
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if immediate:
+        @event.listens_for(engine, 'begin')
+        def begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many password hashes are already queued"""
+
+class PasswordHashingService:
+    """Argon2 hashing and verification on a bounded worker pool.
+
+    Argon2 is deliberately slow, so a burst of logins would otherwise occupy
+    every request worker. Jobs run on a small thread pool (argon2-cffi releases
+    the GIL while hashing) and at most ``workers + queue_depth`` jobs may be in
+    flight; beyond that callers get HashingBusyError instead of piling up.
+    Until init_app() is called, hashing runs inline with Argon2 defaults.
+    argon2-cffi is imported on first use, keeping it out of startup.
+    """
+
+    def __init__(self):
+        self._params = {}
+        self._hasher = None
+        self._executor = None
+        self._slots = None
+        self._metrics_lock = Lock()
+        self._metrics = {}
+
+    def init_app(self, app):
+        """Configure cost parameters and the worker pool from app.config"""
+        self._params = {
+            'time_cost': app.config['ARGON2_TIME_COST'],
+            'memory_cost': app.config['ARGON2_MEMORY_COST'],
+            'parallelism': app.config['ARGON2_PARALLELISM'],
+        }
+        self._hasher = None
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='argon2')
+        self._slots = BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE_DEPTH'])
+        self._metrics = {}
+
+    @property
+    def hasher(self):
+        """The argon2 PasswordHasher, created on first use"""
+        if self._hasher is None:
+            from argon2 import PasswordHasher
+            self._hasher = PasswordHasher(**self._params)
+        return self._hasher
+
+    def _record(self, operation, seconds):
+        with self._metrics_lock:
+            m = self._metrics.setdefault(operation, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rejected': 0})
+            if seconds is None:
+                m['rejected'] += 1
+                return
+            ms = seconds * 1000
+            m['count'] += 1
+            m['total_ms'] += ms
+            m['max_ms'] = max(m['max_ms'], ms)
+
+    def _run(self, operation, fn, *args):
+        def timed():
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(operation, time.perf_counter() - start)
+
+        if self._executor is None:
+            return timed()
+        if not self._slots.acquire(blocking=False):
+            self._record(operation, None)
+            raise HashingBusyError("Too many password operations in progress. Please try again shortly.")
+        try:
+            future = self._executor.submit(timed)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """Hash a password with the configured cost parameters"""
+        return self._run('hash', self.hasher.hash, password)
+
+    def verify(self, password_hash, password):
+        """Return True if the password matches the hash"""
+        from argon2.exceptions import VerifyMismatchError, InvalidHashError
+        
+        def verify():
+            try:
+                return self.hasher.verify(password_hash, password)
+            except (VerifyMismatchError, InvalidHashError):
+                return False
+        return self._run('verify', verify)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with outdated cost parameters"""
+        return self.hasher.check_needs_rehash(password_hash)
+
+    def stats(self):
+        """Latency metrics per operation, in milliseconds"""
+        with self._metrics_lock:
+            return {
+                operation: {
+                    'count': m['count'],
+                    'rejected': m['rejected'],
+                    'avg_ms': round(m['total_ms'] / m['count'], 2) if m['count'] else 0.0,
+                    'max_ms': round(m['max_ms'], 2),
+                }
+                for operation, m in self._metrics.items()
+            }
+
+password_hashing = PasswordHashingService()
+
+# Failed logins within LOCKOUT_PERIOD that lock an account, and for how long
+MAX_LOGIN_ATTEMPTS = 3
+LOCKOUT_PERIOD = timedelta(minutes=15)
 
 class UserRole(Enum):
     """User roles in the system"""
@@ -22,12 +271,14 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), default=UserRole.USER.value, nullable=False)
+    role = db.Column(db.String(20), default=UserRole.USER.value, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
-    login_attempts = db.Column(db.Integer, default=0)  # Failed login attempts
-    last_login_attempt = db.Column(db.DateTime)  # Last failed login time
+    login_attempts = db.Column(db.Integer, default=0)  # Failed logins that locked the account
+    last_login_attempt = db.Column(db.DateTime)  # When the account was locked
     username_reset_enabled = db.Column(db.Boolean, default=False)  # Admin can reset username
+    recipe_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    comment_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')
     
     # Relationships
     recipes = db.relationship('Recipe', backref='author', lazy=True, cascade='all, delete-orphan')
@@ -37,42 +288,41 @@ class User(UserMixin, db.Model):
         """Hash and set password with Argon2"""
         if len(password) < 8:
             raise ValueError("Password must be at least 8 characters long")
-        self.password_hash = pw_hasher.hash(password)
+        self.password_hash = password_hashing.hash(password)
     
     def check_password(self, password):
-        """Check password against Argon2 hash"""
-        try:
-            pw_hasher.verify(self.password_hash, password)
-            return True
-        except VerifyMismatchError:
+        """Check password against Argon2 hash.
+
+        On success, a hash made with outdated cost parameters is replaced; the
+        caller's next commit persists it.
+        """
+        if not password_hashing.verify(self.password_hash, password):
             return False
+        if password_hashing.needs_rehash(self.password_hash):
+            self.password_hash = password_hashing.hash(password)
+        return True
     
     def has_role(self, role):
         """Check if user has specific role"""
         return self.role == role
     
-    def record_failed_login(self):
-        """Record a failed login attempt"""
-        self.login_attempts += 1
+    def lock_login(self, attempts):
+        """Lock the account after too many failed logins; the caller commits"""
+        self.login_attempts = attempts
         self.last_login_attempt = datetime.now()
-        db.session.commit()
     
     def reset_login_attempts(self):
-        """Reset login attempts after successful login"""
+        """Clear a lockout; the caller commits. Returns False if there was none"""
+        if not self.login_attempts and self.last_login_attempt is None:
+            return False
         self.login_attempts = 0
         self.last_login_attempt = None
-        db.session.commit()
+        return True
     
     def is_locked(self):
         """Check if account is locked due to failed login attempts"""
-        if self.login_attempts >= 3:
-            # Lock for 15 minutes
-            if self.last_login_attempt:
-                lockout_time = self.last_login_attempt + timedelta(minutes=15)
-                if datetime.now() < lockout_time:
-                    return True
-            # If lockout period passed, reset attempts
-            self.reset_login_attempts()
+        if self.login_attempts >= MAX_LOGIN_ATTEMPTS and self.last_login_attempt:
+            return datetime.now() < self.last_login_attempt + LOCKOUT_PERIOD
         return False
     
     def __repr__(self):
@@ -88,16 +338,29 @@ class Recipe(db.Model):
     cooking_time = db.Column(db.Integer)  # in minutes
     servings = db.Column(db.Integer)
     difficulty = db.Column(db.String(50), default='Medium')  # Easy, Medium, Hard
-    image_filename = db.Column(db.String(255))
+    image_filename = db.Column(db.String(255), index=True)
+    image_sha256 = db.Column(db.String(64))  # SHA-256 of the uploaded image
+    comment_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.now, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     # Foreign key
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     
     # Relationships
     comments = db.relationship('Comment', backref='recipe', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_recipe_user_created', 'user_id', 'created_at'),
+        db.Index('ix_recipe_difficulty_created', 'difficulty', 'created_at'),
+        db.Index('ix_recipe_cooking_time', 'cooking_time'),
+        db.Index('ix_recipe_servings', 'servings'),
+    )
+    
+    def editable_by(self, user):
+        """Only the author may edit or delete a recipe"""
+        return user.is_authenticated and self.user_id == user.id
+    
     def __repr__(self):
         return f'<Recipe {self.title}>'
 
@@ -108,11 +371,15 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now)
     
     # Foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id', ondelete='CASCADE'), nullable=False)
     
     # Relationships
-    user = db.relationship('User', backref='comments')
+    user = db.relationship('User', backref=db.backref('comments', cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.Index('ix_comment_recipe_created', 'recipe_id', 'created_at'),
+    )
     
     def __repr__(self):
         return f'<Comment by {self.user.username}>'
@@ -120,16 +387,354 @@ class Comment(db.Model):
 class SharedFile(db.Model):
     """Model for files shared by employees"""
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False, index=True)
     original_filename = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     file_size = db.Column(db.Integer)  # in bytes
+    sha256 = db.Column(db.String(64))  # SHA-256 of the file content
     created_at = db.Column(db.DateTime, default=datetime.now, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     is_active = db.Column(db.Boolean, default=True)
     
     # Foreign key
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_shared_file_user_active_created', 'user_id', 'is_active', 'created_at'),
+        db.Index('ix_shared_file_active_created', 'is_active', 'created_at'),
+        # Reference counts of a stored file (storage.reference_count)
+        db.Index('ix_shared_file_filename_active', 'filename', 'is_active'),
+    )
+    
+    def visible_to(self, user):
+        """Admins see every shared file, employees only their own"""
+        if not user.is_authenticated:
+            return False
+        return user.has_role(UserRole.ADMIN.value) or self.user_id == user.id
     
     def __repr__(self):
         return f'<SharedFile {self.original_filename} by {self.uploader.username}>'
+
+class Ingredient(db.Model):
+    """A normalised ingredient name, e.g. 'chicken breast'"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<Ingredient {self.name}>'
+
+class RecipeIngredient(db.Model):
+    """One parsed line of a recipe's ingredients.
+
+    The (ingredient_id, recipe_id) index is the inverted index: the posting
+    list of recipes that use an ingredient, read without touching the table.
+    """
+    __tablename__ = 'recipe_ingredient'
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id', ondelete='CASCADE'), nullable=False, index=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredient.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # line order within the recipe
+    quantity = db.Column(db.Float)
+    unit = db.Column(db.String(20))
+    text = db.Column(db.String(255), nullable=False)  # the line as written
+    
+    ingredient = db.relationship('Ingredient')
+    
+    __table_args__ = (
+        db.Index('ix_recipe_ingredient_postings', 'ingredient_id', 'recipe_id'),
+    )
+
+class RoleCount(db.Model):
+    """Number of users per role, kept up to date on every user insert and delete"""
+    role = db.Column(db.String(20), primary_key=True)
+    user_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    @classmethod
+    def counts(cls):
+        """{role: user count} for every role"""
+        return {row.role: row.user_count for row in cls.query}
+
+class SchemaVersion(db.Model):
+    """Migrations applied to this database (see migrations.py)"""
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+class JobStatus(Enum):
+    """Lifecycle of a background job"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+class Job(db.Model):
+    """A deferred side effect of a write, run by the worker (see jobs.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments
+    # At most one queued job per key; see jobs.enqueue()
+    key = db.Column(db.String(255))
+    status = db.Column(db.String(20), default=JobStatus.QUEUED.value, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.now, nullable=False)  # not before
+    locked_at = db.Column(db.DateTime)  # when a worker claimed it
+    locked_by = db.Column(db.String(80))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_queued_key', 'key', unique=True,
+                 sqlite_where=db.text("status = 'queued'"),
+                 postgresql_where=db.text("status = 'queued'")),
+    )
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.task} {self.status}>'
+
+# ==================== COUNTERS ====================
+# Recipe.comment_count, User.recipe_count/comment_count and RoleCount are
+# adjusted by mapper events in the same flush that inserts or deletes the
+# row, so they commit or roll back with it. Bulk Query.delete()/update() skip
+# these events; reconcile_counters() repairs any drift.
+
+def _adjust(connection, column, key, delta):
+    table = column.table
+    connection.execute(update(table).where(table.primary_key.columns[0] == key)
+                       .values({column.key: column + delta}))
+
+@event.listens_for(RoleCount.__table__, 'after_create')
+def _seed_role_counts(target, connection, **kw):
+    connection.execute(target.insert(), [{'role': role.value, 'user_count': 0} for role in UserRole])
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    _adjust(connection, RoleCount.__table__.c.user_count, target.role, 1)
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    history = inspect(target).attrs.role.history
+    if history.has_changes() and history.deleted:
+        _adjust(connection, RoleCount.__table__.c.user_count, history.deleted[0], -1)
+        _adjust(connection, RoleCount.__table__.c.user_count, target.role, 1)
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _adjust(connection, RoleCount.__table__.c.user_count, target.role, -1)
+
+@event.listens_for(Recipe, 'after_insert')
+def _count_recipe_inserted(mapper, connection, target):
+    _adjust(connection, User.__table__.c.recipe_count, target.user_id, 1)
+
+@event.listens_for(Recipe, 'after_delete')
+def _count_recipe_deleted(mapper, connection, target):
+    _adjust(connection, User.__table__.c.recipe_count, target.user_id, -1)
+
+@event.listens_for(Comment, 'after_insert')
+def _count_comment_inserted(mapper, connection, target):
+    _adjust(connection, Recipe.__table__.c.comment_count, target.recipe_id, 1)
+    _adjust(connection, User.__table__.c.comment_count, target.user_id, 1)
+
+@event.listens_for(Comment, 'after_delete')
+def _count_comment_deleted(mapper, connection, target):
+    _adjust(connection, Recipe.__table__.c.comment_count, target.recipe_id, -1)
+    _adjust(connection, User.__table__.c.comment_count, target.user_id, -1)
+
+def reconcile_counters():
+    """Recompute every counter from the rows it counts.
+
+    Only rows whose stored count drifted are written. Returns
+    {counter name: rows repaired}.
+    """
+    def repair(model, column, actual):
+        result = db.session.execute(
+            update(model).where(column != actual).values({column.key: actual})
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    comments_per_recipe = (select(func.count(Comment.id)).where(Comment.recipe_id == Recipe.id)
+                           .scalar_subquery())
+    recipes_per_user = select(func.count(Recipe.id)).where(Recipe.user_id == User.id).scalar_subquery()
+    comments_per_user = select(func.count(Comment.id)).where(Comment.user_id == User.id).scalar_subquery()
+    repaired = {
+        'recipe.comment_count': repair(Recipe, Recipe.comment_count, comments_per_recipe),
+        'user.recipe_count': repair(User, User.recipe_count, recipes_per_user),
+        'user.comment_count': repair(User, User.comment_count, comments_per_user),
+    }
+
+    actual = dict(db.session.execute(select(User.role, func.count(User.id)).group_by(User.role)).all())
+    stored = RoleCount.counts()
+    repaired['role_count'] = 0
+    for role in set(actual) | set(stored) | {role.value for role in UserRole}:
+        count = actual.get(role, 0)
+        if stored.get(role) != count:
+            db.session.merge(RoleCount(role=role, user_count=count))
+            repaired['role_count'] += 1
+    db.session.commit()
+    return repaired
+
+# ==================== INGREDIENT INDEX ====================
+# Kept in step with Recipe.ingredients by mapper events, like the FTS index
+
+def index_recipe_ingredients(connection, recipe_id, ingredients_text):
+    """Replace a recipe's parsed ingredient rows with a fresh parse of its text"""
+    ingredient_table = Ingredient.__table__
+    postings = RecipeIngredient.__table__
+    connection.execute(postings.delete().where(postings.c.recipe_id == recipe_id))
+    parsed = parse_ingredients(ingredients_text)
+    if not parsed:
+        return
+
+    names = {item.name for item in parsed}
+    ids = dict(connection.execute(
+        select(ingredient_table.c.name, ingredient_table.c.id).where(ingredient_table.c.name.in_(names))
+    ).all())
+    missing = names - ids.keys()
+    if missing:
+        connection.execute(ingredient_table.insert(), [{'name': name} for name in sorted(missing)])
+        ids.update(connection.execute(
+            select(ingredient_table.c.name, ingredient_table.c.id).where(ingredient_table.c.name.in_(missing))
+        ).all())
+
+    connection.execute(postings.insert(), [
+        {'recipe_id': recipe_id, 'ingredient_id': ids[item.name], 'position': position,
+         'quantity': item.quantity, 'unit': item.unit, 'text': item.text}
+        for position, item in enumerate(parsed)
+    ])
+
+@event.listens_for(Recipe, 'after_insert')
+def _recipe_ingredients_inserted(mapper, connection, target):
+    index_recipe_ingredients(connection, target.id, target.ingredients)
+
+@event.listens_for(Recipe, 'after_update')
+def _recipe_ingredients_updated(mapper, connection, target):
+    if inspect(target).attrs.ingredients.history.has_changes():
+        index_recipe_ingredients(connection, target.id, target.ingredients)
+
+@event.listens_for(Recipe, 'before_delete')
+def _recipe_ingredients_deleted(mapper, connection, target):
+    postings = RecipeIngredient.__table__
+    connection.execute(postings.delete().where(postings.c.recipe_id == target.id))
+
+# ==================== FULL-TEXT SEARCH ====================
+
+# Recipe columns mirrored into the FTS5 index, in index column order
+RECIPE_FTS_COLUMNS = ('title', 'description', 'ingredients', 'instructions')
+
+def create_recipe_fts(connection):
+    """Create the FTS5 table that indexes recipe text"""
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts USING fts5("
+        + ', '.join(RECIPE_FTS_COLUMNS)
+        + ", tokenize='porter unicode61')"
+    ))
+
+def rebuild_recipe_fts(connection):
+    """Recreate the FTS5 index from the recipe table"""
+    columns = ', '.join(RECIPE_FTS_COLUMNS)
+    connection.execute(text("DROP TABLE IF EXISTS recipe_fts"))
+    create_recipe_fts(connection)
+    connection.execute(text(
+        f"INSERT INTO recipe_fts(rowid, {columns}) SELECT id, {columns} FROM recipe"
+    ))
+
+def _index_recipe(connection, recipe):
+    connection.execute(
+        text("INSERT INTO recipe_fts(rowid, " + ', '.join(RECIPE_FTS_COLUMNS) + ") "
+             "VALUES (:id, " + ', '.join(':' + c for c in RECIPE_FTS_COLUMNS) + ")"),
+        {'id': recipe.id, **{c: getattr(recipe, c) for c in RECIPE_FTS_COLUMNS}}
+    )
+
+def _unindex_recipe(connection, recipe_id):
+    connection.execute(text("DELETE FROM recipe_fts WHERE rowid = :id"), {'id': recipe_id})
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_fts_tables(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_recipe_fts(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_fts_tables(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("DROP TABLE IF EXISTS recipe_fts"))
+
+@event.listens_for(Recipe, 'after_insert')
+def _recipe_inserted(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        _index_recipe(connection, target)
+
+@event.listens_for(Recipe, 'after_update')
+def _recipe_updated(mapper, connection, target):
+    if connection.dialect.name != 'sqlite':
+        return
+    state = inspect(target)
+    if any(state.attrs[c].history.has_changes() for c in RECIPE_FTS_COLUMNS):
+        _unindex_recipe(connection, target.id)
+        _index_recipe(connection, target)
+
+@event.listens_for(Recipe, 'after_delete')
+def _recipe_deleted(mapper, connection, target):
+    if connection.dialect.name == 'sqlite':
+        _unindex_recipe(connection, target.id)
+
+# ==================== ACCOUNT DELETION ====================
+
+def delete_user_account(user):
+    """Delete a user and everything they own with set-based statements.
+
+    The ORM cascade would load and delete every recipe, comment and file one
+    at a time. Here each table is cleared with one DELETE, children first so
+    the result is the same whether or not the database enforces the ON
+    DELETE CASCADE clauses. The counters and search index that mapper events
+    keep up to date are adjusted the same way. The caller commits.
+
+    Returns (filenames, recipe_ids): the stored files the user referenced,
+    to release after the commit, and the recipes whose pages showed the
+    user's recipes or comments.
+    """
+    user_id = user.id
+    own_recipes = select(Recipe.id).where(Recipe.user_id == user_id)
+    commented_recipes = select(Comment.recipe_id).where(Comment.user_id == user_id)
+    bulk = {'synchronize_session': False}
+
+    filenames = set(db.session.scalars(union(
+        select(Recipe.image_filename).where(Recipe.user_id == user_id, Recipe.image_filename.isnot(None)),
+        select(SharedFile.filename).where(SharedFile.user_id == user_id),
+    )))
+    recipe_ids = set(db.session.scalars(union(own_recipes, commented_recipes)))
+
+    # Counters of other users' rows that lose comments
+    lost = (select(Comment.recipe_id, func.count(Comment.id).label('comments'))
+            .where(Comment.user_id == user_id).group_by(Comment.recipe_id).subquery())
+    db.session.execute(
+        update(Recipe)
+        .where(Recipe.id == lost.c.recipe_id, Recipe.user_id != user_id)
+        .values(comment_count=Recipe.comment_count - lost.c.comments),
+        execution_options=bulk)
+    lost = (select(Comment.user_id, func.count(Comment.id).label('comments'))
+            .where(Comment.recipe_id.in_(own_recipes)).group_by(Comment.user_id).subquery())
+    db.session.execute(
+        update(User)
+        .where(User.id == lost.c.user_id, User.id != user_id)
+        .values(comment_count=User.comment_count - lost.c.comments),
+        execution_options=bulk)
+    db.session.execute(
+        update(RoleCount).where(RoleCount.role == user.role).values(user_count=RoleCount.user_count - 1),
+        execution_options=bulk)
+
+    if db.session.get_bind(mapper=Recipe.__mapper__).dialect.name == 'sqlite':
+        db.session.execute(text("DELETE FROM recipe_fts WHERE rowid IN (SELECT id FROM recipe WHERE user_id = :id)"),
+                           {'id': user_id})
+    db.session.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id.in_(own_recipes)), execution_options=bulk)
+    db.session.execute(delete(Comment).where(Comment.recipe_id.in_(own_recipes)), execution_options=bulk)
+    db.session.execute(delete(Comment).where(Comment.user_id == user_id), execution_options=bulk)
+    db.session.execute(delete(Recipe).where(Recipe.user_id == user_id), execution_options=bulk)
+    db.session.execute(delete(SharedFile).where(SharedFile.user_id == user_id), execution_options=bulk)
+    db.session.execute(delete(User).where(User.id == user_id), execution_options=bulk)
+    if user in db.session:
+        db.session.expunge(user)
+    return filenames, recipe_ids
@@ -0,0 +1,126 @@
+"""Keyset (cursor) pagination.
+
+OFFSET pagination makes the database walk and discard every row before the
+requested page, and Flask-SQLAlchemy's ``paginate()`` adds a ``COUNT(*)`` on
+top. Here a page is addressed by the sort key of the row it starts after,
+``(created_at, id)``, so every page is an index range scan of ``per_page + 1``
+rows no matter how deep it is.
+"""
+
+import base64
+import json
+import time
+from datetime import datetime
+from threading import Lock
+from sqlalchemy import and_, or_
+
+# Cached totals: {cache key: (count, expires at)}
+_count_cache = {}
+_count_cache_lock = Lock()
+COUNT_CACHE_TTL = 60  # seconds
+
+
+def encode_cursor(values):
+    """Encode a list of JSON-serialisable values as an opaque URL-safe token"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; returns None for a missing or malformed token"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def cached_count(query, ttl=COUNT_CACHE_TTL):
+    """COUNT(*) for a query, reused for ``ttl`` seconds.
+
+    Listing totals are only informational, so a count that is up to a minute
+    stale is a good trade for not scanning the table on every page view.
+    """
+    statement = query.order_by(None).statement
+    key = (str(statement), tuple(sorted(statement.compile().params.items(), key=repr)))
+    now = time.monotonic()
+    with _count_cache_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[1] > now:
+            return hit[0]
+    total = query.order_by(None).count()
+    with _count_cache_lock:
+        _count_cache[key] = (total, now + ttl)
+    return total
+
+
+class CursorPagination:
+    """One page of a query, newest first, keyed on ``(created_at, id)``.
+
+    Exposes the same ``items``/``has_next``/``has_prev`` attributes as
+    Flask-SQLAlchemy's pagination object, plus opaque ``next_cursor`` and
+    ``prev_cursor`` tokens for the pager links.
+    """
+
+    def __init__(self, query, model, cursor=None, per_page=10):
+        self.query = query
+        self.per_page = per_page
+        created_at, pk = model.created_at, model.id
+
+        position = decode_cursor(cursor)
+        key = self._parse_key(position[1:]) if position else None
+        backwards = key is not None and position[0] == 'p'
+
+        query = query.order_by(None)
+        if key is None:
+            query = query.order_by(created_at.desc(), pk.desc())
+        elif backwards:
+            query = query.filter(or_(
+                created_at > key[0], and_(created_at == key[0], pk > key[1])
+            )).order_by(created_at.asc(), pk.asc())
+        else:
+            query = query.filter(or_(
+                created_at < key[0], and_(created_at == key[0], pk < key[1])
+            )).order_by(created_at.desc(), pk.desc())
+
+        rows = query.limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+            self.has_prev, self.has_next = more, True
+        else:
+            self.has_prev, self.has_next = key is not None, more
+        self.items = rows
+
+    @staticmethod
+    def _parse_key(values):
+        try:
+            return datetime.fromisoformat(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _cursor(direction, row):
+        return encode_cursor([direction, row.created_at.isoformat(), row.id])
+
+    @property
+    def next_cursor(self):
+        """Token for the page after this one, or None"""
+        if not self.has_next or not self.items:
+            return None
+        return self._cursor('n', self.items[-1])
+
+    @property
+    def prev_cursor(self):
+        """Token for the page before this one, or None"""
+        if not self.has_prev or not self.items:
+            return None
+        return self._cursor('p', self.items[0])
+
+    @property
+    def total(self):
+        """Total row count, cached for COUNT_CACHE_TTL seconds"""
+        return cached_count(self.query)
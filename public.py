@@ -0,0 +1,531 @@
+"""Public and signed-in user pages: browsing, search, accounts, recipes and comments"""
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, session
+from flask_login import login_user, logout_user, login_required, current_user
+from werkzeug.utils import secure_filename
+from markupsafe import Markup
+from models import db, replica_reads, delete_user_account, User, Recipe, Comment
+from queries import (recipe_listing_query, user_recipes_query, get_recipe_or_404,
+                     recipe_comments_query, search_recipes)
+from pagination import CursorPagination
+from cache import cache, invalidate_recipe, invalidate_recipe_listings, invalidate_user
+from lockout import login_throttle
+from auth import evaluate_password_server
+from facets import TIME_LIMITS, parse_filters, apply_filters, facet_counts
+from uploads import send_upload, secure_upload_file
+from storage import blob_path, is_recipe_image
+from images import VARIANTS, is_image, variant_formats, ensure_variant
+from jobs import release_later, release_all_later, generate_variants_later
+import os
+from datetime import datetime
+
+public = Blueprint('public', __name__)
+
+def moved_permanently(endpoint):
+    """308 redirect to ``endpoint`` keeping the query string"""
+    query = request.query_string.decode('latin1')
+    return redirect(url_for(endpoint) + ('?' + query if query else ''), 308)
+
+def page_cache_key(*parts):
+    """Cache key for a rendered page, or None if this response must not be cached.
+    
+    Pages only vary by auth state (anonymous or role), except when a flash
+    message is pending for this session.
+    """
+    if '_flashes' in session:
+        return None
+    auth_state = current_user.role if current_user.is_authenticated else 'anon'
+    return ':'.join(str(part) for part in parts + (auth_state,))
+
+@public.route('/')
+@replica_reads
+def index():
+    """Home page - list all recipes, optionally filtered"""
+    cursor = request.args.get('cursor')
+    filters = parse_filters(request.args)
+    key = page_cache_key('index', cache.generation('recipes'), cursor or '', *filters)
+    html = cache.get(key) if key else None
+    if html is None:
+        query = apply_filters(recipe_listing_query(), filters)
+        recipes = CursorPagination(query, Recipe, cursor=cursor, per_page=6)
+        html = render_template('index.html', recipes=recipes, filters=filters,
+                               facets=facet_counts(filters), time_limits=TIME_LIMITS,
+                               filter_args={k: v for k, v in filters._asdict().items() if v})
+        if key:
+            cache.set(key, html)
+    return html
+
+@public.route('/search')
+@replica_reads
+def search():
+    """Full-text recipe search"""
+    q = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+    recipes, next_cursor = search_recipes(q, cursor=cursor, per_page=12)
+    return render_template('search.html', q=q, recipes=recipes, next_cursor=next_cursor)
+
+@public.route('/api/search')
+def api_search():
+    """Moved to /api/v1/search"""
+    return moved_permanently('api_v1.search')
+
+@public.route('/api/recipes/by-ingredients')
+def api_recipes_by_ingredients():
+    """Moved to /api/v1/recipes/by-ingredients"""
+    return moved_permanently('api_v1.recipes_with_ingredients')
+
+@public.route('/register', methods=['GET', 'POST'])
+def register():
+    """User registration"""
+    if current_user.is_authenticated:
+        return redirect(url_for('public.index'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '')
+        confirm_password = request.form.get('confirm_password', '')
+        
+        # Validation
+        if not all([username, email, password, confirm_password]):
+            flash('All fields are required.', 'danger')
+            return redirect(url_for('public.register'))
+        
+        if len(username) < 3:
+            flash('Username must be at least 3 characters.', 'danger')
+            return redirect(url_for('public.register'))
+        
+        if password != confirm_password:
+            flash('Passwords do not match.', 'danger')
+            return redirect(url_for('public.register'))
+        
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists.', 'danger')
+            return redirect(url_for('public.register'))
+        
+        if User.query.filter_by(email=email).first():
+            flash('Email already exists.', 'danger')
+            return redirect(url_for('public.register'))
+        
+        # Server-side password strength check
+        pw_score, pw_recs = evaluate_password_server(password)
+        # require at least a 'weak' score (2) to proceed
+        if pw_score < 2:
+            msg = 'Password is too weak. '
+            if pw_recs:
+                msg += 'Recommendations: ' + '; '.join(pw_recs[:3])
+            flash(msg, 'danger')
+            return redirect(url_for('public.register'))
+        
+        # Create new user
+        try:
+            user = User(username=username, email=email)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            
+            flash('Registration successful! You can now log in.', 'success')
+            return redirect(url_for('public.login'))
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('public.register'))
+    
+    return render_template('register.html')
+
+@public.route('/login', methods=['GET', 'POST'])
+def login():
+    """User login with session handling and failed login tracking"""
+    if current_user.is_authenticated:
+        return redirect(url_for('public.index'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '')
+        remember = request.form.get('remember', False)
+        
+        if not username or not password:
+            flash('Username and password are required.', 'danger')
+            return redirect(url_for('public.login'))
+        
+        if login_throttle.address_blocked(request.remote_addr):
+            flash('Too many failed login attempts. Please try again in a few minutes.', 'warning')
+            return redirect(url_for('public.login'))
+        
+        user = User.query.filter_by(username=username).first()
+        
+        # Check if user is locked due to failed login attempts
+        if user and user.is_locked():
+            flash('Account temporarily locked. Please try again in 15 minutes.', 'warning')
+            return redirect(url_for('public.login'))
+        
+        if user and user.check_password(password):
+            login_throttle.record_success(user)
+            # Only write when a lockout was cleared or the password was rehashed
+            if db.session.is_modified(user):
+                db.session.commit()
+                invalidate_user(user.id)
+            login_user(user, remember=remember)
+            next_page = request.args.get('next')
+            
+            # Security: validate next_page
+            if next_page and not next_page.startswith('/'):
+                next_page = None
+            
+            flash(f'Welcome back, {user.username}!', 'success')
+            return redirect(next_page or url_for('public.index'))
+        
+        # Record failed login attempt
+        remaining = login_throttle.record_failure(request.remote_addr, user)
+        if user:
+            if remaining > 0:
+                flash(f'Invalid password. {remaining} attempts remaining.', 'danger')
+            else:
+                db.session.commit()
+                invalidate_user(user.id)
+                flash('Account locked due to too many failed login attempts. Please contact an admin.', 'danger')
+        else:
+            flash('Invalid username or password.', 'danger')
+    
+    return render_template('login.html')
+
+
+@public.route('/logout')
+@login_required
+def logout():
+    """User logout"""
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('public.index'))
+
+@public.route('/recipe/new', methods=['GET', 'POST'])
+@login_required
+def new_recipe():
+    """Create new recipe"""
+    if request.method == 'POST':
+        title = request.form.get('title', '').strip()
+        description = request.form.get('description', '').strip()
+        ingredients = request.form.get('ingredients', '').strip()
+        instructions = request.form.get('instructions', '').strip()
+        cooking_time = request.form.get('cooking_time', type=int)
+        servings = request.form.get('servings', type=int)
+        difficulty = request.form.get('difficulty', 'Medium')
+        
+        # Validation
+        if not all([title, description, ingredients, instructions]):
+            flash('Title, description, ingredients, and instructions are required.', 'danger')
+            return redirect(url_for('public.new_recipe'))
+        
+        if len(title) < 5:
+            flash('Recipe title must be at least 5 characters.', 'danger')
+            return redirect(url_for('public.new_recipe'))
+        
+        # Handle file upload
+        image = None
+        if 'image' in request.files:
+            file = request.files['image']
+            try:
+                image = secure_upload_file(file)
+            except ValueError as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('public.new_recipe'))
+        
+        # Create recipe
+        recipe = Recipe(
+            title=title,
+            description=description,
+            ingredients=ingredients,
+            instructions=instructions,
+            cooking_time=cooking_time,
+            servings=servings,
+            difficulty=difficulty,
+            image_filename=image.filename if image else None,
+            image_sha256=image.sha256 if image else None,
+            user_id=current_user.id
+        )
+        
+        db.session.add(recipe)
+        generate_variants_later(recipe.image_filename)
+        db.session.commit()
+        invalidate_recipe_listings()
+        
+        flash('Recipe created successfully!', 'success')
+        return redirect(url_for('public.view_recipe', recipe_id=recipe.id))
+    
+    return render_template('new_recipe.html')
+
+@public.route('/recipe/<int:recipe_id>')
+@replica_reads
+def view_recipe(recipe_id):
+    """View recipe details"""
+    cursor = request.args.get('comments')
+    # Anonymous pages carry no per-session state (CSRF tokens), so cache them whole
+    key = None
+    if not current_user.is_authenticated and not cursor:
+        key = page_cache_key('recipe', recipe_id)
+    html = cache.get(key) if key else None
+    if html is not None:
+        return html
+    
+    recipe = get_recipe_or_404(recipe_id)
+    comments = CursorPagination(recipe_comments_query(recipe_id), Comment, cursor=cursor,
+                                per_page=current_app.config['COMMENTS_PER_PAGE'])
+    
+    recipe_body = cache.get(f'recipe-body:{recipe_id}')
+    if recipe_body is None:
+        recipe_body = render_template('_recipe_body.html', recipe=recipe)
+        cache.set(f'recipe-body:{recipe_id}', recipe_body)
+    
+    html = render_template('view_recipe.html', recipe=recipe, comments=comments,
+                           recipe_body=Markup(recipe_body))
+    if key:
+        cache.set(key, html)
+    return html
+
+@public.route('/recipe/<int:recipe_id>/comments')
+@replica_reads
+def recipe_comments(recipe_id):
+    """Next batch of a recipe's comments as JSON, newest first"""
+    Recipe.query.get_or_404(recipe_id)
+    cursor = request.args.get('cursor')
+    per_page = min(max(request.args.get('per_page', current_app.config['COMMENTS_PER_PAGE'], type=int), 1), 50)
+    comments = CursorPagination(recipe_comments_query(recipe_id), Comment, cursor=cursor, per_page=per_page)
+    return jsonify({
+        'comments': [{
+            'id': comment.id,
+            'author': comment.user.username,
+            'content': comment.content,
+            'created_at': comment.created_at.isoformat(),
+            'created_at_display': comment.created_at.strftime('%B %d, %Y at %I:%M %p'),
+        } for comment in comments.items],
+        'next_cursor': comments.next_cursor,
+    })
+
+@public.route('/recipe/<int:recipe_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_recipe(recipe_id):
+    """Edit recipe"""
+    recipe = Recipe.query.get_or_404(recipe_id)
+    
+    # Check authorization
+    if not recipe.editable_by(current_user):
+        flash('You do not have permission to edit this recipe.', 'danger')
+        return redirect(url_for('public.view_recipe', recipe_id=recipe_id))
+    
+    if request.method == 'POST':
+        recipe.title = request.form.get('title', '').strip()
+        recipe.description = request.form.get('description', '').strip()
+        recipe.ingredients = request.form.get('ingredients', '').strip()
+        recipe.instructions = request.form.get('instructions', '').strip()
+        recipe.cooking_time = request.form.get('cooking_time', type=int)
+        recipe.servings = request.form.get('servings', type=int)
+        recipe.difficulty = request.form.get('difficulty', 'Medium')
+        
+        # Validation
+        if not all([recipe.title, recipe.description, recipe.ingredients, recipe.instructions]):
+            flash('All required fields must be filled.', 'danger')
+            return redirect(url_for('public.edit_recipe', recipe_id=recipe_id))
+        
+        # Handle new image
+        old_image = recipe.image_filename
+        if 'image' in request.files:
+            file = request.files['image']
+            try:
+                image = secure_upload_file(file)
+                if image:
+                    recipe.image_filename = image.filename
+                    recipe.image_sha256 = image.sha256
+            except ValueError as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('public.edit_recipe', recipe_id=recipe_id))
+        
+        recipe.updated_at = datetime.now()
+        # Delete old image once no other recipe or file uses it
+        if recipe.image_filename != old_image:
+            release_later(old_image)
+            generate_variants_later(recipe.image_filename)
+        db.session.commit()
+        invalidate_recipe(recipe_id)
+        invalidate_recipe_listings()
+        
+        flash('Recipe updated successfully!', 'success')
+        return redirect(url_for('public.view_recipe', recipe_id=recipe_id))
+    
+    return render_template('edit_recipe.html', recipe=recipe)
+
+@public.route('/recipe/<int:recipe_id>/delete', methods=['POST'])
+@login_required
+def delete_recipe(recipe_id):
+    """Delete recipe"""
+    recipe = Recipe.query.get_or_404(recipe_id)
+    
+    # Check authorization
+    if not recipe.editable_by(current_user):
+        flash('You do not have permission to delete this recipe.', 'danger')
+        return redirect(url_for('public.view_recipe', recipe_id=recipe_id))
+    
+    db.session.delete(recipe)
+    # Delete image once no other recipe or file uses it
+    release_later(recipe.image_filename)
+    db.session.commit()
+    invalidate_recipe(recipe_id)
+    invalidate_recipe_listings()
+    
+    flash('Recipe deleted successfully!', 'success')
+    return redirect(url_for('public.my_recipes'))
+
+@public.route('/my-recipes')
+@replica_reads
+@login_required
+def my_recipes():
+    """View current user's recipes"""
+    cursor = request.args.get('cursor')
+    recipes = CursorPagination(user_recipes_query(current_user.id), Recipe, cursor=cursor, per_page=6)
+    return render_template('my_recipes.html', recipes=recipes)
+
+@public.route('/recipe/<int:recipe_id>/comment', methods=['POST'])
+@login_required
+def add_comment(recipe_id):
+    """Add comment to recipe"""
+    recipe = Recipe.query.get_or_404(recipe_id)
+    
+    content = request.form.get('content', '').strip()
+    
+    if not content:
+        flash('Comment cannot be empty.', 'danger')
+        return redirect(url_for('public.view_recipe', recipe_id=recipe_id))
+    
+    if len(content) > 500:
+        flash('Comment must be less than 500 characters.', 'danger')
+        return redirect(url_for('public.view_recipe', recipe_id=recipe_id))
+    
+    comment = Comment(content=content, user_id=current_user.id, recipe_id=recipe_id)
+    db.session.add(comment)
+    db.session.commit()
+    invalidate_recipe(recipe_id)
+    
+    flash('Comment added successfully!', 'success')
+    return redirect(url_for('public.view_recipe', recipe_id=recipe_id))
+
+@public.route('/upload/<filename>')
+def download_file(filename):
+    """Download uploaded file"""
+    # Security: prevent directory traversal
+    filename = secure_filename(filename)
+    filepath = blob_path(current_app.config['UPLOAD_FOLDER'], filename)
+    
+    # Verify file is within upload folder, public and exists
+    response = None
+    if (os.path.abspath(filepath).startswith(os.path.abspath(current_app.config['UPLOAD_FOLDER']))
+            and is_recipe_image(filename)):
+        response = send_upload(filepath)
+    if response is None:
+        flash('File not found.', 'danger')
+        return redirect(url_for('public.index'))
+    
+    return response
+
+@public.route('/upload/<filename>/<variant>.<fmt>')
+def image_variant(filename, variant, fmt):
+    """Serve a resized variant of an uploaded image, generating it on first request"""
+    filename = secure_filename(filename)
+    if (not is_image(filename) or variant not in VARIANTS or fmt not in variant_formats(filename)
+            or not is_recipe_image(filename)):
+        return render_template('404.html'), 404
+    
+    try:
+        path = ensure_variant(blob_path(current_app.config['UPLOAD_FOLDER'], filename), variant, fmt)
+    except OSError:
+        path = None
+    if path is None:
+        # No Pillow or an unreadable image: fall back to the original
+        return download_file(filename)
+    
+    return send_upload(path) or download_file(filename)
+
+@public.route('/profile')
+@replica_reads
+@login_required
+def profile():
+    """View user profile"""
+    return render_template('profile.html', recipe_count=current_user.recipe_count,
+                           comment_count=current_user.comment_count)
+
+@public.route('/change-password', methods=['GET', 'POST'])
+@login_required
+def change_password():
+    """Allow user to change their password"""
+    if request.method == 'POST':
+        current_password = request.form.get('current_password', '')
+        new_password = request.form.get('new_password', '')
+        confirm_password = request.form.get('confirm_password', '')
+        
+        # Validate current password
+        if not current_user.check_password(current_password):
+            flash('Current password is incorrect.', 'danger')
+            return redirect(url_for('public.change_password'))
+        
+        # Validate new passwords match
+        if new_password != confirm_password:
+            flash('New passwords do not match.', 'danger')
+            return redirect(url_for('public.change_password'))
+        
+        # Check password strength
+        if len(new_password) < 8:
+            flash('New password must be at least 8 characters long.', 'danger')
+            return redirect(url_for('public.change_password'))
+        
+        # Check against common passwords
+        lower = new_password.lower()
+        common = ['password', '1234', 'qwerty', 'admin', 'letmein', 'iloveyou']
+        if any(c in lower for c in common):
+            flash('New password is too common. Please choose a stronger password.', 'danger')
+            return redirect(url_for('public.change_password'))
+        
+        try:
+            current_user.set_password(new_password)
+            db.session.commit()
+            invalidate_user(current_user.id)
+            flash('Password changed successfully!', 'success')
+            return redirect(url_for('public.profile'))
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('public.change_password'))
+    
+    return render_template('change_password.html')
+
+@public.route('/delete-account', methods=['GET', 'POST'])
+@login_required
+def delete_account():
+    """Allow user to delete their own account"""
+    if request.method == 'POST':
+        password = request.form.get('password', '')
+        confirm_delete = request.form.get('confirm_delete', '')
+        
+        # Verify password
+        if not current_user.check_password(password):
+            flash('Password is incorrect.', 'danger')
+            return redirect(url_for('public.delete_account'))
+        
+        # Verify confirmation
+        if confirm_delete != 'DELETE':
+            flash('Please type DELETE to confirm account deletion.', 'danger')
+            return redirect(url_for('public.delete_account'))
+        
+        # Delete user account with their recipes, comments and files
+        user = current_user._get_current_object()
+        user_id = user.id
+        logout_user()
+        filenames, recipe_ids = delete_user_account(user)
+        # Delete files no other user still references
+        release_all_later(filenames)
+        db.session.commit()
+        invalidate_user(user_id)
+        
+        for recipe_id in recipe_ids:
+            invalidate_recipe(recipe_id)
+        invalidate_recipe_listings()
+        
+        flash('Your account has been deleted successfully.', 'info')
+        return redirect(url_for('public.index'))
+    
+    return render_template('delete_account.html')
@@ -0,0 +1,214 @@
+"""Shared query layer for listing routes.
+
+Every route that renders a list of rows goes through one of these helpers so
+the relationships the templates touch are loaded up front instead of one
+lazy SELECT per row. Many-to-one relationships (author, uploader, comment
+user) use joined loading: a single LEFT OUTER JOIN on the same round trip.
+"""
+
+import re
+from sqlalchemy import intersect, or_, select, text
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from models import db, Recipe, Comment, SharedFile, User, UserRole, Ingredient, RecipeIngredient
+from ingredients import normalise_name
+from pagination import encode_cursor, decode_cursor
+from cache import cache
+
+# BM25 column weights, in RECIPE_FTS_COLUMNS order: a hit in the title counts
+# for more than one buried in the instructions
+SEARCH_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# User columns kept out of the session-loader cache: secret or updated by
+# counter triggers that do not invalidate it
+USER_UNCACHED_COLUMNS = ['password_hash', 'recipe_count', 'comment_count']
+
+
+def recipe_listing_query():
+    """All recipes, newest first, with each recipe's author"""
+    return Recipe.query.options(
+        joinedload(Recipe.author)
+    ).order_by(Recipe.created_at.desc())
+
+
+def get_user_cached(user_id, ttl=60):
+    """Load a user for the session loader, from the cache when possible.
+
+    The user's columns are cached for ``ttl`` seconds and merged back into
+    the session without a SELECT. The password hash and the counters are not
+    cached; they are loaded on first access, which only the password checks
+    and the profile page do. Routes that change a user call
+    cache.invalidate_user() after committing, which only reaches every worker
+    with a shared cache backend.
+    """
+    key = f'user:{user_id}'
+    state = cache.get(key)
+    if state is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            cache.set(key, {
+                column.key: getattr(user, column.key)
+                for column in User.__table__.columns if column.key not in USER_UNCACHED_COLUMNS
+            }, ttl)
+        return user
+
+    user = User(**state)
+    make_transient_to_detached(user)
+    user = db.session.merge(user, load=False)
+    db.session.expire(user, USER_UNCACHED_COLUMNS)
+    return user
+
+
+def recipes_by_ids(ids, options=()):
+    """Recipes with the given ids in one IN query, in the order asked for.
+
+    Returns (recipes, missing ids).
+    """
+    found = {
+        recipe.id: recipe
+        for recipe in Recipe.query.options(*options).filter(Recipe.id.in_(ids))
+    }
+    return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
+
+
+def user_recipes_query(user_id):
+    """One user's recipes, newest first"""
+    return Recipe.query.filter_by(user_id=user_id).order_by(Recipe.created_at.desc())
+
+
+def get_recipe_or_404(recipe_id):
+    """Load a single recipe together with its author"""
+    return Recipe.query.options(
+        joinedload(Recipe.author)
+    ).filter_by(id=recipe_id).first_or_404()
+
+
+def recipe_comments_query(recipe_id):
+    """Comments of a recipe, newest first, with each commenter"""
+    return Comment.query.options(
+        joinedload(Comment.user)
+    ).filter_by(recipe_id=recipe_id).order_by(Comment.created_at.desc())
+
+
+def active_shared_files_query(user_id=None):
+    """Active shared files, newest first, with each uploader.
+
+    When ``user_id`` is given only that employee's files are returned and the
+    uploader is already known, so no join is added.
+    """
+    query = SharedFile.query.filter_by(is_active=True)
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    else:
+        query = query.options(joinedload(SharedFile.uploader))
+    return query.order_by(SharedFile.created_at.desc())
+
+
+def employees_query():
+    """All employee accounts"""
+    return User.query.filter_by(role=UserRole.EMPLOYEE.value)
+
+
+def build_match_query(terms):
+    """Turn free text from the user into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term so FTS5 operators typed by the user
+    cannot cause syntax errors. Returns None when there is nothing to search.
+    """
+    words = re.findall(r'\w+', terms or '')
+    if not words:
+        return None
+    return ' AND '.join(f'"{word}"*' for word in words[:10])
+
+
+def _recipe_options(options):
+    return (joinedload(Recipe.author),) if options is None else options
+
+
+def search_recipes(terms, cursor=None, per_page=10, options=None):
+    """Full-text search over recipes ranked by BM25.
+
+    Results are keyset-paginated on (rank, id), so fetching a later page costs
+    the same as the first. Recipes are loaded with ``options``, by default
+    with their author. Returns (recipes, next_cursor).
+    """
+    match = build_match_query(terms)
+    if match is None:
+        return [], None
+
+    params = {'match': match, 'limit': per_page + 1}
+    after = ''
+    position = decode_cursor(cursor)
+    if position is not None and len(position) == 2:
+        params['rank'], params['last_id'] = position
+        after = 'WHERE rank > :rank OR (rank = :rank AND id > :last_id)'
+
+    weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+    rows = db.session.execute(text(
+        f"SELECT id, rank FROM ("
+        f"  SELECT rowid AS id, bm25(recipe_fts, {weights}) AS rank"
+        f"  FROM recipe_fts WHERE recipe_fts MATCH :match"
+        f") {after} ORDER BY rank, id LIMIT :limit"
+    ), params).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor([rows[-1].rank, rows[-1].id])
+
+    ids = [row.id for row in rows]
+    recipes = {
+        recipe.id: recipe
+        for recipe in Recipe.query.options(*_recipe_options(options)).filter(Recipe.id.in_(ids))
+    }
+    return [recipes[i] for i in ids if i in recipes], next_cursor
+
+
+def matching_ingredient_ids(term):
+    """Ids of every ingredient whose name contains ``term`` as whole words.
+
+    "chicken" matches "chicken", "chicken breast" and "smoked chicken".
+    """
+    name = normalise_name(term)
+    if not name:
+        return []
+    return db.session.scalars(select(Ingredient.id).where(or_(
+        Ingredient.name == name,
+        Ingredient.name.like(f'{name} %'),
+        Ingredient.name.like(f'% {name}'),
+        Ingredient.name.like(f'% {name} %'),
+    ))).all()
+
+
+def _postings(ingredient_ids):
+    return select(RecipeIngredient.recipe_id).where(RecipeIngredient.ingredient_id.in_(ingredient_ids))
+
+
+def recipes_by_ingredients(include, exclude=(), cursor=None, per_page=10, options=None):
+    """Recipes that use every ``include`` ingredient and none of ``exclude``.
+
+    Each term resolves to a posting list read from the (ingredient_id,
+    recipe_id) index; the lists are intersected, and the excluded ones
+    subtracted, in the database, so no recipe row is read until the final
+    page. Results are newest first, keyset-paginated on id, and loaded with
+    ``options`` (by default with their author). Returns (recipes,
+    next_cursor).
+    """
+    included = [matching_ingredient_ids(term) for term in include]
+    if not included or not all(included):
+        return [], None
+    excluded = [i for term in exclude for i in matching_ingredient_ids(term)]
+
+    matches = intersect(*(_postings(ids) for ids in included)) if len(included) > 1 else _postings(included[0])
+    query = Recipe.query.options(*_recipe_options(options)).filter(Recipe.id.in_(matches))
+    if excluded:
+        query = query.filter(Recipe.id.not_in(_postings(excluded)))
+    position = decode_cursor(cursor)
+    if position and isinstance(position[0], int):
+        query = query.filter(Recipe.id < position[0])
+    recipes = query.order_by(Recipe.id.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(recipes) > per_page:
+        recipes = recipes[:per_page]
+        next_cursor = encode_cursor([recipes[-1].id])
+    return recipes, next_cursor
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+"""Rebuild the full-text recipe search index for an existing database"""
+
+from app import create_app
+from models import db, rebuild_recipe_fts
+
+def rebuild_search_index():
+    """Drop and repopulate the FTS5 index from the recipe table"""
+    app = create_app(with_routes=False)
+    with app.app_context():
+        print("Rebuilding recipe search index...")
+        with db.engine.begin() as connection:
+            rebuild_recipe_fts(connection)
+        print("✅ Search index rebuilt successfully!")
+
+if __name__ == '__main__':
+    rebuild_search_index()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+"""Repair drift in the denormalised comment, recipe and user counters"""
+
+from app import create_app
+from models import reconcile_counters
+
+def reconcile():
+    """Recompute every counter from the underlying rows"""
+    app = create_app(with_routes=False)
+    with app.app_context():
+        print("Reconciling counters...")
+        repaired = reconcile_counters()
+        for name, rows in repaired.items():
+            print(f"  {name:22s} {rows} repaired")
+        print("✅ Counters reconciled successfully!")
+
+if __name__ == '__main__':
+    reconcile()
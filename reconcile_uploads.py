@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""Reconcile the upload folder with the database.
+
+Moves files no recipe or active shared file references (and unfinished
+uploads left by crashes) to UPLOAD_QUARANTINE_FOLDER, and lists referenced
+files that are missing from disk. Files newer than the grace period are
+never touched, so it is safe to run while the app is serving.
+
+    python reconcile_uploads.py --dry-run     report only
+    python reconcile_uploads.py               quarantine orphans
+    python reconcile_uploads.py --delete      delete orphans instead
+"""
+
+import argparse
+import sys
+from app import create_app
+from storage import reconcile_upload_folder
+
+def reconcile(args):
+    """Quarantine or delete orphaned uploads and report missing ones"""
+    app = create_app(with_routes=False)
+    with app.app_context():
+        grace_hours = app.config['UPLOAD_ORPHAN_GRACE_HOURS'] if args.grace_hours is None else args.grace_hours
+        quarantine = None if args.delete else app.config['UPLOAD_QUARANTINE_FOLDER']
+        print(f"Reconciling {app.config['UPLOAD_FOLDER']} (grace {grace_hours:g} h)"
+              f"{', dry run' if args.dry_run else ''}...")
+        report = reconcile_upload_folder(app.config['UPLOAD_FOLDER'], grace_hours * 3600,
+                                         quarantine_folder=quarantine, dry_run=args.dry_run)
+        action = 'found' if args.dry_run else 'deleted' if args.delete else f'moved to {quarantine}'
+        print(f"✅ {report.scanned} files scanned, {report.orphans} orphans "
+              f"({report.orphan_bytes / 1024 / 1024:.1f} MB) {action}")
+        if report.missing:
+            print(f"❌ {len(report.missing)} referenced files are missing")
+            return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--dry-run', action='store_true', help='report orphans without touching them')
+    parser.add_argument('--delete', action='store_true', help='delete orphans instead of quarantining')
+    parser.add_argument('--grace-hours', type=float, help='spare files modified this recently')
+    return reconcile(parser.parse_args())
+
+if __name__ == '__main__':
+    sys.exit(main())
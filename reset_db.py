@@ -3,20 +3,37 @@
 
 import os
 import sys
-from app import app, db
-from models import User, UserRole
 from dotenv import load_dotenv
 
+# Before config.py is imported, so SECRET_KEY and DATABASE_URL from .env apply
 load_dotenv()
 
+from app import create_app
+from models import db, User, UserRole
+from migrations import create_database
+
+def required_env(name):
+    """Value of an environment variable from .env; exit if it is missing"""
+    value = os.environ.get(name)
+    if not value:
+        print(f"❌ ERROR: '{name}' variable cannot be found in .env file!")
+        print("   Please copy .env.example to make the .env file and fill the password.")
+        sys.exit(1)
+    return value
+
 def reset_database():
     """Drop all tables and recreate them"""
+    # Check the passwords before anything is dropped
+    admin_pass = required_env('ADMIN_PASSWORD')
+    employee_pass = required_env('EMPLOYEE_PASSWORD')
+    
+    app = create_app(with_routes=False)
     with app.app_context():
         print("Dropping all tables...")
         db.drop_all()
         
         print("Creating all tables...")
-        db.create_all()
+        create_database()
         
         print("Creating default test user...")
         # Create a test user with 'user' role
@@ -34,11 +51,6 @@ def reset_database():
             email='admin@example.com',
             role=UserRole.ADMIN.value
         )
-        admin_pass = os.environ.get('ADMIN_PASSWORD')
-        if not admin_pass:
-            print("❌ ERROR: 'ADMIN_PASSWORD' variable cannot be found in .env file!")
-            print("   Please copy .env.example to make the .env file and fill the password.")
-            sys.exit(1)
         admin_user.set_password(admin_pass)
         db.session.add(admin_user)
         
@@ -48,11 +60,6 @@ def reset_database():
             email='employee@example.com',
             role=UserRole.EMPLOYEE.value
         )
-        employee_pass = os.environ.get('EMPLOYEE_PASSWORD')
-        if not employee_pass:
-            print("❌ ERROR: 'EMPLOYEE_PASSWORD' variable cannot be found in .env file!")
-            print("   Please copy .env.example to make the .env file and fill the password.")
-            sys.exit(1)
         employee_user.set_password(employee_pass)
         db.session.add(employee_user)
         
@@ -61,8 +68,8 @@ def reset_database():
         print("✅ Database reset successfully!")
         print("\nDefault test users created:")
         print("  👤 User: demo / demo1234")
-        print("  🔐 Admin: admin / admin1234")
-        print("  👨‍💼 Employee: employee / employee1234")
+        print("  🔐 Admin: admin / ADMIN_PASSWORD from .env")
+        print("  👨‍💼 Employee: employee / EMPLOYEE_PASSWORD from .env")
 
 if __name__ == '__main__':
     reset_database()
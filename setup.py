@@ -27,11 +27,15 @@ def check_requirements():
 def initialize_database():
     """Initialize the database"""
     try:
-        from app import app, db
+        from app import create_app
+        from models import db
+        from migrations import prepare_database
+        app = create_app(with_routes=False)
         with app.app_context():
-            db.create_all()
+            # Create a new database, or apply pending migrations to an existing one
+            prepare_database(log=lambda line: None)
             print("✅ Database initialized successfully")
-            print("📊 Database file: recipe_app.db")
+            print(f"📊 Database file: {db.engine.url.database}")
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
         return False
@@ -40,9 +44,10 @@ def initialize_database():
 def create_test_user():
     """Create a test user (optional)"""
     try:
-        from app import app, db
-        from models import User
+        from app import create_app
+        from models import db, User
         
+        app = create_app(with_routes=False)
         with app.app_context():
             if not User.query.filter_by(username='demo').first():
                 user = User(username='demo', email='demo@example.com')
@@ -90,8 +95,9 @@ def main():
     print("✨ Setup complete!")
     print("=" * 50)
     print()
-    print("🚀 To start the application, run:")
+    print("🚀 To start the development server, run:")
     print("   python app.py")
+    print("   (production: gunicorn -c gunicorn.conf.py wsgi:app)")
     print()
     print("📱 Access the app at: http://localhost:5000")
     print()
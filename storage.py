@@ -0,0 +1,236 @@
+"""Content-addressed blob store for uploads.
+
+Every upload is stored once under the SHA-256 of its content, as
+``UPLOAD_FOLDER/ab/cd/<sha256>.<ext>``. The two-level shard keeps directories
+small. The public filename kept in ``Recipe.image_filename`` and
+``SharedFile.filename`` is just ``<sha256>.<ext>``, so re-uploading the same
+photo or PDF reuses the existing blob.
+
+A blob may be referenced by any number of rows; it is only unlinked once the
+last recipe image or active shared file pointing at it is gone. Files from
+before this layout (random-token names in the top-level folder) are still
+served from where they are until dedupe_uploads.py moves them.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+from sqlalchemy import select, union
+from models import db, Recipe, SharedFile
+from images import VARIANTS, delete_variants, is_image
+
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})\.[a-z0-9]+$')
+_LEGACY_VARIANT_NAME = re.compile(r'^[0-9a-f]{32}_[a-z]+\.[a-z0-9]+$')
+_TEMP_SUFFIXES = ('.part', '.tmp')  # unfinished uploads and image variants
+
+ReconcileReport = namedtuple('ReconcileReport', ['scanned', 'orphans', 'orphan_bytes', 'missing'])
+
+
+def blob_filename(sha256, ext):
+    """Public filename of a blob"""
+    return f"{sha256}.{ext}"
+
+
+def blob_path(upload_folder, filename):
+    """Where a file lives on disk: sharded for blobs, flat for legacy uploads"""
+    match = _BLOB_NAME.match(filename)
+    if match is None:
+        return os.path.join(upload_folder, filename)
+    digest = match.group(1)
+    return os.path.join(upload_folder, digest[:2], digest[2:4], filename)
+
+
+def reference_count(filename):
+    """Number of recipes and active shared files using a stored file"""
+    return (
+        Recipe.query.filter_by(image_filename=filename).count()
+        + SharedFile.query.filter_by(filename=filename, is_active=True).count()
+    )
+
+
+def is_recipe_image(filename):
+    """Whether a recipe uses a stored file as its image.
+
+    Only those files are public: shared files live in the same store and
+    are served by employee.download_file() after its ownership check.
+    """
+    return db.session.scalar(select(Recipe.id).filter_by(image_filename=filename).limit(1)) is not None
+
+
+def modified_within(path, seconds):
+    """Whether a file was modified less than ``seconds`` ago; False if it is gone"""
+    try:
+        return os.stat(path).st_mtime > time.time() - seconds
+    except FileNotFoundError:
+        return False
+
+
+def release_blob(upload_folder, filename, grace_seconds=0):
+    """Unlink a stored file and its image variants if nothing references it.
+
+    Call after the commit that dropped the reference, so the count reflects
+    it. A file modified within ``grace_seconds`` is kept: ingest_upload()
+    touches a blob when a new upload reuses it, before that upload's row is
+    committed, so it may be about to gain a reference; the caller tries again
+    after the grace. Returns True if the file was removed.
+    """
+    if not filename or reference_count(filename) > 0:
+        return False
+    path = blob_path(upload_folder, filename)
+    if not os.path.exists(path) or modified_within(path, grace_seconds):
+        return False
+    if is_image(filename):
+        delete_variants(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_upload_folder(upload_folder, log=print):
+    """Move legacy flat uploads into the blob store, merging duplicates.
+
+    Each top-level file is hashed and moved to its blob path (or dropped if
+    that blob already exists), and the rows that referenced it are pointed at
+    the blob name. Legacy image variants are removed; they are regenerated on
+    demand. Returns (files moved, duplicates removed).
+    """
+    moved = duplicates = 0
+    with os.scandir(upload_folder) as entries:
+        names = sorted(entry.name for entry in entries if entry.is_file())
+
+    for name in names:
+        path = os.path.join(upload_folder, name)
+        if _BLOB_NAME.match(name) or name.startswith('.') or name.endswith(('.part', '.tmp')):
+            continue
+        if _LEGACY_VARIANT_NAME.match(name):
+            os.remove(path)
+            continue
+        if '.' not in name:
+            continue
+
+        sha256 = _file_sha256(path)
+        filename = blob_filename(sha256, name.rsplit('.', 1)[1].lower())
+        target = blob_path(upload_folder, filename)
+        duplicate = os.path.exists(target)
+        if not duplicate:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.link(path, target)  # keep the old name until the rows are updated
+
+        Recipe.query.filter_by(image_filename=name).update(
+            {'image_filename': filename, 'image_sha256': sha256}, synchronize_session=False)
+        SharedFile.query.filter_by(filename=name).update(
+            {'filename': filename, 'sha256': sha256}, synchronize_session=False)
+        db.session.commit()
+
+        if os.path.exists(path):
+            os.remove(path)
+        if duplicate:
+            duplicates += 1
+            log(f"  duplicate  {name} -> {filename}")
+        else:
+            moved += 1
+            log(f"  moved      {name} -> {filename}")
+    return moved, duplicates
+
+
+def referenced_filenames(batch_size=1000):
+    """Every filename a recipe or active shared file points at.
+
+    Read through a server-side cursor ``batch_size`` rows at a time, so the
+    rows are never all loaded at once.
+    """
+    query = union(
+        select(Recipe.image_filename).where(Recipe.image_filename.isnot(None)),
+        select(SharedFile.filename).where(SharedFile.is_active.is_(True)),
+    )
+    result = db.session.execute(query, execution_options={'yield_per': batch_size})
+    return set(result.scalars())
+
+
+def _scan_files(folder, skip):
+    """Yield (relative path, DirEntry) for every file below ``folder``, streamed"""
+    pending = ['']
+    while pending:
+        relative = pending.pop()
+        with os.scandir(os.path.join(folder, relative)) as entries:
+            for entry in entries:
+                path = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.abspath(entry.path) != skip:
+                        pending.append(path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield path, entry
+
+
+def _variant_of(name):
+    """Stem of the original a variant filename belongs to, or None"""
+    stem = name.rsplit('.', 1)[0]
+    if '_' not in stem:
+        return None
+    original, variant = stem.rsplit('_', 1)
+    return original if variant in VARIANTS else None
+
+
+def reconcile_upload_folder(upload_folder, grace_seconds, quarantine_folder=None,
+                            dry_run=False, log=print):
+    """Find files nothing references and references to files that are gone.
+
+    A file is an orphan when no recipe or active shared file names it (nor,
+    for an image variant, its original), or when it is an unfinished
+    ``.part``/``.tmp`` left by a crash. Orphans modified within
+    ``grace_seconds`` are left alone: they may belong to an upload whose row
+    is not committed yet. Older orphans are moved under ``quarantine_folder``
+    (same relative path) or, without one, deleted; ``dry_run`` only reports
+    them. Referenced files missing from disk are reported, never changed.
+    """
+    referenced = referenced_filenames()
+    stems = {name.rsplit('.', 1)[0] for name in referenced}
+    present = set()
+    cutoff = time.time() - grace_seconds
+    skip = os.path.abspath(quarantine_folder) if quarantine_folder else None
+    scanned = orphans = orphan_bytes = 0
+
+    for relative, entry in _scan_files(upload_folder, skip):
+        scanned += 1
+        name = entry.name
+        if name.startswith('.'):
+            continue
+        if name in referenced and entry.path == blob_path(upload_folder, name):
+            present.add(name)
+            continue
+        if not name.endswith(_TEMP_SUFFIXES) and _variant_of(name) in stems:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            continue
+
+        orphans += 1
+        orphan_bytes += stat.st_size
+        if dry_run:
+            log(f"  orphan       {relative} ({stat.st_size} bytes)")
+        elif quarantine_folder:
+            target = os.path.join(quarantine_folder, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(entry.path, target)
+            log(f"  quarantined  {relative}")
+        else:
+            os.remove(entry.path)
+            log(f"  deleted      {relative}")
+
+    missing = sorted(referenced - present)
+    for name in missing:
+        log(f"  missing      {name}")
+    return ReconcileReport(scanned, orphans, orphan_bytes, missing)
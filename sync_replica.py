@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""Copy the primary SQLite database onto local SQLite read replicas"""
+
+import sqlite3
+from app import create_app
+from models import db, REPLICA_BIND_PREFIX
+
+def sync_replicas():
+    """Snapshot the primary into every SQLite replica.
+
+    A stand-in for real replication when trying replica routing locally with
+    two SQLite files (DATABASE_REPLICA_URLS=sqlite:///replica.db); run it
+    again whenever the replica should catch up.
+    """
+    app = create_app(with_routes=False)
+    with app.app_context():
+        replicas = {key: engine for key, engine in db.engines.items()
+                    if key and key.startswith(REPLICA_BIND_PREFIX)}
+        if not replicas:
+            print("❌ No replicas configured. Set DATABASE_REPLICA_URLS first.")
+            return
+        for key, engine in sorted(replicas.items()):
+            if engine.dialect.name != 'sqlite':
+                print(f"  skipped {key} (not SQLite)")
+                continue
+            target = sqlite3.connect(engine.url.database)
+            try:
+                with db.engine.raw_connection() as connection:
+                    connection.driver_connection.backup(target)
+            finally:
+                target.close()
+            print(f"  copied {db.engine.url.database} -> {engine.url.database}")
+        print("✅ Replicas synced successfully!")
+
+if __name__ == '__main__':
+    sync_replicas()
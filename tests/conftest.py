@@ -0,0 +1,103 @@
+"""Shared fixtures: the app on a scratch SQLite database and upload folder.
+
+Every test gets a fresh database seeded with three accounts (a user, an
+employee and an admin, all with PASSWORD), a dozen recipes with comments and
+a few shared files, so listing pages have enough rows to show a per-row query.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import TestingConfig
+from models import db, User, Recipe, Comment, SharedFile
+
+PASSWORD = 'Passw0rd!x'
+RECIPES = 12
+COMMENTS_PER_RECIPE = 3
+SHARED_FILES = 5
+
+
+def seed():
+    """alice (user, id 1), emp (employee, id 2), adm (admin, id 3) and their content"""
+    alice = User(username='alice', email='alice@example.com', role='user')
+    emp = User(username='emp', email='emp@example.com', role='employee')
+    adm = User(username='adm', email='adm@example.com', role='admin')
+    for user in (alice, emp, adm):
+        user.set_password(PASSWORD)
+    db.session.add_all([alice, emp, adm])
+    db.session.commit()
+    for i in range(RECIPES):
+        recipe = Recipe(title=f'Chicken curry {i}', description='A weeknight curry',
+                        ingredients='2 cups rice\n1 lb chicken breast\n3 tbsp peanuts',
+                        instructions='Cook everything.', difficulty='Easy',
+                        cooking_time=20 + i, servings=2, user_id=alice.id if i % 3 else emp.id)
+        db.session.add(recipe)
+        db.session.flush()
+        for j in range(COMMENTS_PER_RECIPE):
+            db.session.add(Comment(content=f'Comment {j}', recipe_id=recipe.id,
+                                   user_id=(alice, emp, adm)[j % 3].id))
+    for i in range(SHARED_FILES):
+        db.session.add(SharedFile(filename=f'{i:064x}.pdf', original_filename=f'handbook-{i}.pdf',
+                                  file_size=100, user_id=emp.id))
+    db.session.commit()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(TestingConfig, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(TestingConfig, 'UPLOAD_QUARANTINE_FOLDER', str(tmp_path / 'quarantine'))
+    app = create_app('testing')
+    with app.app_context():
+        # Default bind only: db.metadatas keeps the 'reader' bind of any
+        # production app an earlier test created
+        db.create_all(bind_key=None)
+        seed()
+        db.session.remove()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(app):
+    """Return a test client logged in as the given username"""
+    def log_in(username):
+        client = app.test_client()
+        response = client.post('/login', data={'username': username, 'password': PASSWORD})
+        assert response.status_code == 302, f"login as {username} failed"
+        return client
+    return log_in
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting every SQL statement run on any engine inside it"""
+    @contextmanager
+    def counting():
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', listener)
+    return counting
@@ -0,0 +1,55 @@
+"""Search endpoints of the JSON API and the old paths that redirect to them."""
+
+import pytest
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/search?q=curry',
+    '/api/v1/recipes/by-ingredients?include=rice,chicken&exclude=beef',
+])
+def test_results_carry_list_fields_and_an_etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    recipes = response.json['recipes']
+    assert len(recipes) == 10
+    assert set(recipes[0]) == {'id', 'title', 'description', 'author', 'difficulty', 'cooking_time',
+                               'servings', 'comment_count', 'image_url', 'created_at'}
+    assert response.json['next_cursor']
+
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_search_pages_with_the_cursor(client):
+    first = client.get('/api/v1/search?q=curry&per_page=5').json
+    second = client.get(f"/api/v1/search?q=curry&per_page=5&cursor={first['next_cursor']}").json
+    ids = [recipe['id'] for recipe in first['recipes'] + second['recipes']]
+    assert len(ids) == len(set(ids)) == 10
+
+
+def test_fields_selects_what_is_returned(client):
+    response = client.get('/api/v1/recipes/by-ingredients?include=chicken&fields=title,author')
+    assert set(response.json['recipes'][0]) == {'title', 'author'}
+    assert response.json['recipes'][0]['author']['username'] in ('alice', 'emp')
+
+    response = client.get('/api/v1/search?q=curry&fields=title,secret')
+    assert response.status_code == 400
+    assert response.json == {'error': 'Bad Request', 'message': 'Unknown fields: secret'}
+
+
+def test_missing_ingredients_is_a_json_error(client):
+    response = client.get('/api/v1/recipes/by-ingredients?exclude=beef')
+    assert response.status_code == 400
+    assert response.json['message'] == 'At least one ingredient to include is required.'
+
+
+@pytest.mark.parametrize('old, new', [
+    ('/api/search?q=chicken+curry&per_page=3', '/api/v1/search?q=chicken+curry&per_page=3'),
+    ('/api/recipes/by-ingredients?include=rice&include=chicken',
+     '/api/v1/recipes/by-ingredients?include=rice&include=chicken'),
+])
+def test_old_paths_redirect_permanently(client, old, new):
+    response = client.get(old)
+    assert response.status_code == 308
+    assert response.headers['Location'] == new
+    assert client.get(old, follow_redirects=True).json == client.get(new).json
@@ -0,0 +1,228 @@
+"""The background job queue, run in-process with Worker.drain()."""
+
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from jobs import Worker, backoff, enqueue, retry_failed, task
+from models import db, Job, JobStatus, Recipe
+from storage import blob_path
+from uploads import ingest_upload
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'pixels' * 100
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Register test tasks for this test only; returns the payloads they saw"""
+    monkeypatch.setattr(jobs, 'TASKS', dict(jobs.TASKS))
+    seen = []
+
+    @task('test.record')
+    def record(**payload):
+        seen.append(payload)
+
+    @task('test.flaky', max_attempts=3)
+    def flaky(succeed_on):
+        seen.append(succeed_on)
+        if len(seen) < succeed_on:
+            raise RuntimeError(f"attempt {len(seen)} failed")
+
+    return seen
+
+
+@pytest.fixture
+def worker(app):
+    return Worker(app, threads=1, name='test')
+
+
+def jobs_by_status(app):
+    with app.app_context():
+        return {status.value: Job.query.filter_by(status=status.value).count() for status in JobStatus}
+
+
+def make_due(app):
+    """Pretend the backoff delay of every queued job has passed"""
+    with app.app_context():
+        for job in Job.query.filter_by(status=JobStatus.QUEUED.value):
+            job.run_at = datetime.now() - timedelta(seconds=1)
+        db.session.commit()
+
+
+def test_drain_runs_due_jobs_with_their_payload(app, worker, calls):
+    with app.app_context():
+        enqueue('test.record', number=1)
+        enqueue('test.record', number=2, names=['a', 'b'])
+        db.session.commit()
+    assert worker.drain() == 2
+    assert calls == [{'number': 1}, {'number': 2, 'names': ['a', 'b']}]
+    assert jobs_by_status(app)['done'] == 2
+    assert worker.drain() == 0
+
+
+def test_enqueue_rolls_back_with_the_write(app, worker, calls):
+    with app.app_context():
+        enqueue('test.record', number=1)
+        db.session.rollback()
+        assert Job.query.count() == 0
+    assert worker.drain() == 0
+    assert calls == []
+
+
+def test_enqueue_rejects_unknown_task(app, calls):
+    with app.app_context(), pytest.raises(ValueError):
+        enqueue('test.missing')
+
+
+def test_delayed_job_waits_until_due(app, worker, calls):
+    with app.app_context():
+        enqueue('test.record', delay=60, number=1)
+        db.session.commit()
+    assert worker.drain() == 0
+    make_due(app)
+    assert worker.drain() == 1
+
+
+def test_key_coalesces_while_queued(app, worker, calls):
+    with app.app_context():
+        enqueue('test.record', key='same', number=1)
+        enqueue('test.record', key='same', number=2)
+        db.session.commit()
+        enqueue('test.record', key='same', number=3)
+        db.session.commit()
+        assert Job.query.count() == 1
+    assert worker.drain() == 1
+    assert calls == [{'number': 1}]
+
+    # Once the job has run, the key is free again
+    with app.app_context():
+        enqueue('test.record', key='same', number=4)
+        db.session.commit()
+    assert worker.drain() == 1
+    assert calls == [{'number': 1}, {'number': 4}]
+
+
+def test_failure_is_retried_after_backoff(app, worker, calls):
+    app.config.update(JOB_BACKOFF_BASE=10, JOB_BACKOFF_MAX=600)
+    with app.app_context():
+        enqueue('test.flaky', succeed_on=2)
+        db.session.commit()
+    before = datetime.now()
+    assert worker.drain() == 1
+    with app.app_context():
+        job = Job.query.one()
+        assert job.status == JobStatus.QUEUED.value
+        assert job.attempts == 1
+        assert job.last_error == 'RuntimeError: attempt 1 failed'
+        # First retry after half to all of JOB_BACKOFF_BASE
+        assert before + timedelta(seconds=5) <= job.run_at <= datetime.now() + timedelta(seconds=10)
+
+    assert worker.drain() == 0  # not due yet
+    make_due(app)
+    assert worker.drain() == 1
+    with app.app_context():
+        job = Job.query.one()
+        assert (job.status, job.attempts, job.last_error) == (JobStatus.DONE.value, 2, None)
+
+
+def test_failure_gives_up_after_max_attempts(app, worker, calls):
+    with app.app_context():
+        enqueue('test.flaky', succeed_on=10)
+        db.session.commit()
+    for _ in range(3):
+        make_due(app)
+        assert worker.drain() == 1
+    make_due(app)
+    assert worker.drain() == 0
+    with app.app_context():
+        job = Job.query.one()
+        assert (job.status, job.attempts) == (JobStatus.FAILED.value, 3)
+        assert job.finished_at is not None
+        assert job.last_error == 'RuntimeError: attempt 3 failed'
+
+
+def test_backoff_doubles_up_to_the_cap():
+    for attempts, low, high in [(1, 5, 10), (2, 10, 20), (3, 20, 40), (10, 300, 600)]:
+        for _ in range(20):
+            assert low <= backoff(attempts, 10, 600) <= high
+
+
+def test_retry_failed_requeues_unless_key_is_queued(app, worker, calls):
+    with app.app_context():
+        db.session.add_all([
+            Job(task='test.record', payload='{"number": 1}', status=JobStatus.FAILED.value, attempts=5),
+            Job(task='test.record', payload='{"number": 2}', key='busy', status=JobStatus.FAILED.value, attempts=5),
+        ])
+        enqueue('test.record', key='busy', number=3)
+        db.session.commit()
+        assert retry_failed() == 1
+    assert worker.drain() == 2
+    assert sorted(call['number'] for call in calls) == [1, 3]
+
+
+def test_recover_requeues_jobs_of_a_lost_worker(app, worker, calls):
+    with app.app_context():
+        enqueue('test.record', number=1)
+        enqueue('test.record', key='lost', number=2)
+        enqueue('test.record', number=3)
+        db.session.commit()
+        # A worker claims them all and dies
+        claimed = [worker.claim().id for _ in range(3)]
+        stale = datetime.now() - timedelta(seconds=app.config['JOB_TIMEOUT'] + 1)
+        for job in Job.query:
+            job.locked_at = stale
+        # The third had used up its attempts; the second's work is queued again meanwhile
+        db.session.get(Job, claimed[2]).max_attempts = 1
+        enqueue('test.record', key='lost', number=4)
+        db.session.commit()
+
+        worker.recover()
+        statuses = {job.id: (job.status, job.last_error) for job in Job.query}
+    assert statuses[claimed[0]] == (JobStatus.QUEUED.value, None)
+    assert statuses[claimed[1]] == (JobStatus.FAILED.value, 'Worker stopped responding')
+    assert statuses[claimed[2]] == (JobStatus.FAILED.value, 'Worker stopped responding')
+    assert worker.drain() == 2
+    assert sorted(call['number'] for call in calls) == [1, 4]
+
+
+def test_recover_leaves_recent_running_jobs_alone(app, worker, calls):
+    with app.app_context():
+        enqueue('test.record', number=1)
+        db.session.commit()
+        worker.claim()
+        worker.recover()
+        assert Job.query.one().status == JobStatus.RUNNING.value
+
+
+def test_deleting_a_recipe_releases_its_image(app, login, worker):
+    stored = ingest_upload(io.BytesIO(PNG), 'png', app.config['UPLOAD_FOLDER'])
+    path = blob_path(app.config['UPLOAD_FOLDER'], stored.filename)
+    with app.app_context():
+        db.session.get(Recipe, 2).image_filename = stored.filename  # alice's
+        db.session.commit()
+
+    response = login('alice').post('/recipe/2/delete')
+    assert response.status_code == 302
+    assert os.path.exists(path)  # the response did not wait for the file
+    with app.app_context():
+        job = Job.query.one()
+        assert (job.task, job.key) == ('release_blob', f'release_blob:{stored.filename}')
+    # Just uploaded, so within the release grace: kept, and tried again after it
+    assert worker.drain() == 1
+    assert os.path.exists(path)
+    assert jobs_by_status(app)['queued'] == 1
+    with app.app_context():
+        retry = Job.query.filter_by(status=JobStatus.QUEUED.value).one()
+        assert retry.key == f'release_blob:{stored.filename}'
+        assert retry.run_at > datetime.now() + timedelta(seconds=app.config['UPLOAD_RELEASE_GRACE_SECONDS'] - 60)
+
+    aged = time.time() - app.config['UPLOAD_RELEASE_GRACE_SECONDS'] - 1
+    os.utime(path, (aged, aged))
+    make_due(app)
+    assert worker.drain() == 1
+    assert not os.path.exists(path)
+    assert jobs_by_status(app)['done'] == 2
@@ -0,0 +1,114 @@
+"""Sliding-window counters behind the login throttle."""
+
+import sys
+import types
+
+import pytest
+
+import lockout
+from lockout import MemoryCounterStore, RedisCounterStore
+
+
+class FakeRedis:
+    """The sorted-set commands RedisCounterStore uses, on plain dicts"""
+
+    def __init__(self):
+        self.sets = {}
+
+    @classmethod
+    def from_url(cls, url):
+        return cls()
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.sets.get(key, {})
+        for member, score in list(members.items()):
+            if low <= score <= high:
+                del members[member]
+
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.sets.get(key, {}))
+
+    def zcount(self, key, low, high):
+        exclusive = low.startswith('(')
+        low = float(low.lstrip('('))
+        high = float('inf') if high == '+inf' else float(high)
+        return sum(1 for score in self.sets.get(key, {}).values()
+                   if (score > low if exclusive else score >= low) and score <= high)
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lockout.time, 'time', clock)
+    monkeypatch.setattr(lockout.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request, monkeypatch, clock):
+    if request.param == 'memory':
+        return MemoryCounterStore()
+    monkeypatch.setitem(sys.modules, 'redis', types.SimpleNamespace(Redis=FakeRedis))
+    return RedisCounterStore('redis://fake')
+
+
+def test_count_only_includes_events_inside_the_window(store, clock):
+    assert store.hit('address:1', 60) == 1
+    clock.now += 30
+    assert store.hit('address:1', 60) == 2
+    assert store.count('address:1', 60) == 2
+    clock.now += 31  # the first hit has left the window; nothing has trimmed it
+    assert store.count('address:1', 60) == 1
+    clock.now += 30
+    assert store.count('address:1', 60) == 0
+
+
+def test_clear_forgets_a_key(store, clock):
+    store.hit('user:1', 60)
+    store.clear('user:1')
+    assert store.count('user:1', 60) == 0
+    assert store.hit('user:1', 60) == 1
+
+
+def test_address_unblocks_when_failures_age_out(app, store, clock):
+    throttle = lockout.LoginThrottle()
+    throttle.init_app(app)
+    throttle.store = store
+    for _ in range(throttle.address_limit):
+        throttle.record_failure('10.0.0.1')
+    assert throttle.address_blocked('10.0.0.1')
+    assert not throttle.address_blocked('10.0.0.2')
+    clock.now += throttle.address_window + 1
+    assert not throttle.address_blocked('10.0.0.1')
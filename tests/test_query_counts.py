@@ -0,0 +1,49 @@
+"""Every listing route runs a fixed number of queries, however many rows it shows.
+
+The budgets count each statement the page sends with the page cache off, and
+include the session user loader. A relationship loaded lazily per row (author,
+comment user, uploader) pushes a route past its budget, because the seeded
+pages show several rows of each kind.
+"""
+
+import pytest
+from config import TestingConfig
+
+# (logged in as, URL, most queries allowed)
+ROUTE_BUDGETS = [
+    (None, '/', 2),
+    (None, '/search?q=chicken', 2),
+    (None, '/api/v1/search?q=chicken', 2),
+    (None, '/api/v1/recipes/by-ingredients?include=rice&include=chicken', 3),
+    (None, '/recipe/1', 2),
+    (None, '/recipe/1/comments', 2),
+    (None, '/api/v1/recipes', 1),
+    (None, '/api/v1/recipes/1', 1),
+    (None, '/api/v1/recipes/1/comments', 2),
+    ('alice', '/', 2),
+    ('alice', '/my-recipes', 2),
+    ('alice', '/profile', 1),
+    ('alice', '/recipe/1', 3),
+    ('alice', '/api/v1/me', 1),
+    ('emp', '/employee/dashboard', 2),
+    ('emp', '/employee/my-files', 2),
+    ('emp', '/api/v1/shared-files', 2),
+    ('adm', '/admin/dashboard', 3),
+    ('adm', '/admin/view-shared-files', 2),
+]
+
+
+@pytest.fixture(autouse=True)
+def no_page_cache(monkeypatch):
+    # Cached pages run no queries at all; measure the rendering path
+    monkeypatch.setattr(TestingConfig, 'CACHE_TYPE', 'null')
+
+
+@pytest.mark.parametrize('username, url, budget', ROUTE_BUDGETS,
+                         ids=[f'{username or "anonymous"} {url}' for username, url, _ in ROUTE_BUDGETS])
+def test_route_query_budget(client, login, count_queries, username, url, budget):
+    client = login(username) if username else client
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(statements) <= budget, '\n'.join(statements)
@@ -0,0 +1,28 @@
+"""Every route query uses an index, as checked by ``python migrate.py check``."""
+
+import pytest
+
+from migrate import full_scans, query_plans
+
+
+@pytest.fixture
+def plans(app):
+    with app.app_context():
+        return query_plans()
+
+
+def test_every_route_query_is_planned(plans):
+    assert plans
+    assert all(plan for _, plan in plans)
+
+
+def test_no_route_query_scans_a_table(plans):
+    scans = {name: full_scans(plan) for name, plan in plans if full_scans(plan)}
+    assert scans == {}
+
+
+def test_full_scans_flags_table_scans_and_sorts():
+    assert full_scans(['SCAN recipe']) == ['SCAN recipe']
+    assert full_scans(['SEARCH recipe USING INDEX ix_recipe_created_at (created_at<?)',
+                       'USE TEMP B-TREE FOR ORDER BY']) == ['USE TEMP B-TREE FOR ORDER BY']
+    assert full_scans(['SCAN recipe USING INDEX ix_recipe_created_at', 'SCAN ingredient']) == []
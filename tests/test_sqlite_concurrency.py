@@ -0,0 +1,93 @@
+"""ProductionConfig's SQLite profile under parallel writes.
+
+Before WAL, busy_timeout and BEGIN IMMEDIATE, concurrent comment posts and
+login-attempt updates failed with "database is locked". Here 16 threads each
+commit 50 of those write pairs against one database file while reading
+through the reader bind, and every write must land.
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from config import ProductionConfig
+from models import db, User, Recipe, Comment
+
+THREADS = 16
+WRITES_PER_THREAD = 50
+
+
+@pytest.fixture
+def production_app(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_DATABASE_URI', url)
+    monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_BINDS',
+                        {'reader': dict(ProductionConfig.SQLALCHEMY_BINDS['reader'], url=url)})
+    monkeypatch.setattr(ProductionConfig, 'CACHE_SQLITE_PATH', str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(ProductionConfig, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(username=f'user{i}', email=f'user{i}@example.com', password_hash='!')
+                            for i in range(8)])
+        db.session.commit()
+        db.session.add(Recipe(title='Shared recipe', description='d', ingredients='1 egg',
+                              instructions='Boil.', user_id=1))
+        db.session.commit()
+        db.session.remove()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_pragmas_applied(production_app):
+    with production_app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        assert db.session.execute(text('PRAGMA foreign_keys')).scalar() == 1
+        with db.engines['reader'].connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA query_only').scalar() == 1
+            with pytest.raises(OperationalError):
+                connection.exec_driver_sql("DELETE FROM comment")
+
+
+def test_parallel_writes_all_commit(production_app):
+    statements = {'reader': 0, 'writer': 0}
+    with production_app.app_context():
+        engines = {'reader': db.engines['reader'], 'writer': db.engines[None]}
+    for name, engine in engines.items():
+        event.listen(engine, 'before_cursor_execute',
+                     lambda *args, name=name: statements.__setitem__(name, statements[name] + 1))
+    errors = []
+
+    def post_comments(number):
+        with production_app.app_context():
+            for i in range(WRITES_PER_THREAD):
+                try:
+                    db.session.get(Recipe, 1)  # a read before the write, as a route does
+                    db.session.add(Comment(content=f'{number}-{i}', user_id=1 + number % 8, recipe_id=1))
+                    user = db.session.get(User, 1 + number % 8)
+                    user.login_attempts = (user.login_attempts or 0) + 1
+                    db.session.commit()
+                except Exception as error:
+                    errors.append(repr(error))
+                    db.session.rollback()
+            db.session.remove()
+
+    threads = [threading.Thread(target=post_comments, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with production_app.app_context():
+        assert Comment.query.count() == THREADS * WRITES_PER_THREAD
+        assert db.session.get(Recipe, 1).comment_count == THREADS * WRITES_PER_THREAD
+        assert sum(user.login_attempts for user in User.query) == THREADS * WRITES_PER_THREAD
+    assert statements['reader'] > 0
@@ -0,0 +1,194 @@
+"""File delivery modes, checked against a fake front web server.
+
+In x-sendfile and x-accel-redirect modes the app answers with headers only
+and the front end (nginx, Apache) sends the file named by the internal
+redirect. FakeFrontEnd plays that part, so each mode is checked end to end:
+the client must get the same bytes and headers in every mode, and the app
+must hand nothing over before its authorization checks pass.
+"""
+
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import Headers
+
+from models import db, User, Recipe, SharedFile
+from storage import blob_path
+from uploads import ingest_upload
+from conftest import PASSWORD
+
+MODES = ['direct', 'x-sendfile', 'x-accel-redirect']
+PNG = b'\x89PNG\r\n\x1a\n' + b'not really an image' * 100
+PDF = b'%PDF-1.4\n' + b'handbook ' * 1000
+
+
+class FakeFrontEnd:
+    """WSGI middleware that serves the file an internal-redirect header names"""
+
+    def __init__(self, wsgi_app, upload_folder, accel_prefix):
+        self.wsgi_app = wsgi_app
+        self.upload_folder = upload_folder
+        self.accel_prefix = accel_prefix
+        self.app_headers = None  # what the app itself answered, last request
+        self.app_body = None
+
+    def __call__(self, environ, start_response):
+        answer = {}
+
+        def capture(status, headers, exc_info=None):
+            answer.update(status=status, headers=Headers(headers))
+
+        iterable = self.wsgi_app(environ, capture)
+        try:
+            body = b''.join(iterable)
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        headers = answer['headers']
+        self.app_headers, self.app_body = headers.copy(), body
+
+        path = headers.pop('X-Sendfile', None)
+        internal = headers.pop('X-Accel-Redirect', None)
+        if internal is not None:
+            assert internal.startswith(self.accel_prefix)
+            path = os.path.join(self.upload_folder, *internal[len(self.accel_prefix):].split('/'))
+        if path is None:
+            start_response(answer['status'], list(headers))
+            return [body]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        headers['Content-Length'] = str(len(data))
+        start_response('200 OK', list(headers))
+        return [data]
+
+
+@pytest.fixture(params=MODES)
+def front_end(request, app):
+    app.config['UPLOAD_DELIVERY_MODE'] = request.param
+    app.wsgi_app = FakeFrontEnd(app.wsgi_app, app.config['UPLOAD_FOLDER'],
+                                app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'])
+    return app.wsgi_app
+
+
+@pytest.fixture
+def stored(app):
+    """Store PNG as a recipe image and PDF as emp's (id 2) shared file.
+
+    Returns (png name, pdf name, shared file id).
+    """
+    upload_folder = app.config['UPLOAD_FOLDER']
+    png = ingest_upload(io.BytesIO(PNG), 'png', upload_folder)
+    pdf = ingest_upload(io.BytesIO(PDF), 'pdf', upload_folder)
+    with app.app_context():
+        shared = SharedFile(filename=pdf.filename, original_filename='Handbook.pdf',
+                            file_size=pdf.size, sha256=pdf.sha256, user_id=2)
+        db.session.add(shared)
+        db.session.get(Recipe, 2).image_filename = png.filename
+        db.session.commit()
+        return png.filename, pdf.filename, shared.id
+
+
+def assert_handed_over(app, front_end, filename):
+    """The app's own response carried no body, just the right redirect header"""
+    mode = app.config['UPLOAD_DELIVERY_MODE']
+    path = blob_path(app.config['UPLOAD_FOLDER'], filename)
+    if mode == 'direct':
+        assert 'X-Sendfile' not in front_end.app_headers
+        assert 'X-Accel-Redirect' not in front_end.app_headers
+        return
+    assert front_end.app_body == b''
+    assert 'Content-Length' not in front_end.app_headers or front_end.app_headers['Content-Length'] == '0'
+    if mode == 'x-sendfile':
+        assert front_end.app_headers['X-Sendfile'] == os.path.abspath(path)
+    else:
+        relative = os.path.relpath(path, app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        assert front_end.app_headers['X-Accel-Redirect'] == app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'] + relative
+
+
+def test_public_upload(app, client, front_end, stored):
+    png, _, _ = stored
+    response = client.get(f'/upload/{png}')
+    assert response.status_code == 200
+    assert response.data == PNG
+    assert response.headers['Content-Type'] == 'image/png'
+    assert response.headers['Content-Length'] == str(len(PNG))
+    assert response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'public' in response.headers['Cache-Control']
+    assert_handed_over(app, front_end, png)
+
+
+def test_not_modified_is_not_handed_over(app, client, front_end, stored):
+    png, _, _ = stored
+    etag = client.get(f'/upload/{png}').headers['ETag']
+    response = client.get(f'/upload/{png}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert 'X-Sendfile' not in front_end.app_headers
+    assert 'X-Accel-Redirect' not in front_end.app_headers
+
+
+def test_employee_downloads_own_file(app, login, front_end, stored):
+    _, pdf, file_id = stored
+    response = login('emp').get(f'/employee/download-file/{file_id}')
+    assert response.status_code == 200
+    assert response.data == PDF
+    assert response.headers['Content-Type'] == 'application/pdf'
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert 'Handbook.pdf' in response.headers['Content-Disposition']
+    assert 'private' in response.headers['Cache-Control']
+    assert_handed_over(app, front_end, pdf)
+
+
+@pytest.mark.parametrize('path', ['{pdf}', '{png}/card.png'])
+def test_only_recipe_images_are_public(app, client, login, front_end, stored, path):
+    png, pdf, _ = stored
+    with app.app_context():
+        db.session.get(Recipe, 2).image_filename = None
+        db.session.commit()
+    for browser in (client, login('adm'), login('emp')):
+        response = browser.get('/upload/' + path.format(pdf=pdf, png=png))
+        assert response.status_code in (302, 404)
+        assert PDF not in response.data and PNG not in response.data
+        assert 'X-Sendfile' not in front_end.app_headers
+        assert 'X-Accel-Redirect' not in front_end.app_headers
+
+
+def test_other_employee_is_refused_before_hand_over(app, login, front_end, stored):
+    _, _, file_id = stored
+    with app.app_context():
+        other = User(username='emp2', email='emp2@example.com', role='employee')
+        other.set_password(PASSWORD)
+        db.session.add(other)
+        db.session.commit()
+    response = login('emp2').get(f'/employee/download-file/{file_id}')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/employee/my-files')
+    assert 'X-Sendfile' not in front_end.app_headers
+    assert 'X-Accel-Redirect' not in front_end.app_headers
+    assert PDF not in response.data
+
+
+def test_inactive_file_is_not_handed_over(app, login, front_end, stored):
+    _, _, file_id = stored
+    with app.app_context():
+        db.session.get(SharedFile, file_id).is_active = False
+        db.session.commit()
+    response = login('emp').get(f'/employee/download-file/{file_id}')
+    assert response.status_code == 302
+    assert 'X-Sendfile' not in front_end.app_headers
+    assert 'X-Accel-Redirect' not in front_end.app_headers
+
+
+def test_api_does_not_expose_the_download_key(app, login, stored):
+    _, pdf, file_id = stored
+    sha256 = pdf.split('.')[0]
+    admin = login('adm')
+    for url in ('/api/v1/shared-files', f'/api/v1/shared-files/{file_id}'):
+        response = admin.get(url)
+        assert response.status_code == 200
+        assert sha256 not in response.get_data(as_text=True)
+    assert admin.get('/api/v1/shared-files?fields=sha256').status_code == 400
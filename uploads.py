@@ -0,0 +1,216 @@
+"""Storing and serving files in UPLOAD_FOLDER.
+
+Incoming files are streamed to disk in fixed-size chunks, hashed and sized in
+the same pass, checked against the magic bytes of their extension and only
+then atomically renamed into the content-addressed store (see storage.py).
+
+Stored filenames are content hashes (or, for older uploads, random tokens)
+that are never reused for different content, so responses can be cached by
+browsers and proxies for as long as they like. Responses carry a
+content-derived ETag and Last-Modified, and send_file() answers
+If-None-Match / If-Modified-Since with 304 and Range requests with 206.
+"""
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from flask import current_app, send_file
+from storage import blob_filename, blob_path
+from images import FILE_MODE
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes a file must start with to be accepted under each extension
+MAGIC_NUMBERS = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'docx': (b'PK\x03\x04',),
+}
+SNIFF_SIZE = 16
+
+IngestedUpload = namedtuple('IngestedUpload', ['filename', 'size', 'sha256'])
+
+
+def content_matches_extension(ext, head):
+    """Check the first bytes of a file against what its extension promises"""
+    if ext == 'txt':
+        return b'\x00' not in head
+    return head.startswith(MAGIC_NUMBERS.get(ext, (b'',)))
+
+
+def ingest_upload(stream, ext, upload_folder):
+    """Stream an upload into the blob store in one pass.
+
+    The data is copied chunk by chunk into a temporary file in the upload
+    folder while its SHA-256 and size are computed, so the whole file is never
+    held in memory. Content that does not match ``ext`` is rejected with
+    ValueError before the rest is read. The temporary file is renamed to its
+    content-addressed blob path only once complete, so readers never see a
+    partial upload; if that blob already exists the copy is discarded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    sniffed = False
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not sniffed:
+                    head += chunk[:SNIFF_SIZE - len(head)]
+                    if len(head) >= SNIFF_SIZE or not chunk:
+                        if not content_matches_extension(ext, head):
+                            raise ValueError(f"File content does not match its .{ext} extension")
+                        sniffed = True
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        # mkstemp() made it 0600; blobs are read by whoever serves the folder
+        os.chmod(tmp_path, FILE_MODE)
+        sha256 = digest.hexdigest()
+        filename = blob_filename(sha256, ext)
+        target = blob_path(upload_folder, filename)
+        if os.path.exists(target):
+            try:
+                # Fresh mtime: the orphan reconciler spares it until the row commits
+                os.utime(target)
+            except FileNotFoundError:  # released meanwhile; keep this copy
+                os.replace(tmp_path, target)
+            else:
+                os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return IngestedUpload(filename, size, sha256)
+
+# {(path, mtime_ns, size): sha256 hex}, most recently used last
+_etag_cache = OrderedDict()
+_etag_cache_lock = Lock()
+ETAG_CACHE_SIZE = 4096
+
+
+def content_etag(path, stat):
+    """SHA-256 of a file's content, computed once per (path, mtime, size)"""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _etag_cache_lock:
+        etag = _etag_cache.get(key)
+        if etag is not None:
+            _etag_cache.move_to_end(key)
+            return etag
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+
+    with _etag_cache_lock:
+        _etag_cache[key] = etag
+        while len(_etag_cache) > ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return etag
+
+
+def _offload(path, response):
+    """Hand the transfer of a file response to the front web server.
+
+    In ``x-sendfile`` or ``x-accel-redirect`` mode the body is dropped and an
+    internal-redirect header tells the front end (Apache mod_xsendfile,
+    lighttpd, nginx) which file to send; it then also handles Range requests.
+    Headers already computed here (type, disposition, caching) are kept.
+    """
+    mode = current_app.config['UPLOAD_DELIVERY_MODE']
+    if mode == 'direct' or response.status_code == 304:
+        return response
+    response.close()
+
+    headers = [(key, value) for key, value in response.headers
+               if key not in ('Content-Length', 'Content-Range', 'Accept-Ranges')]
+    offloaded = current_app.response_class(None, status=200, headers=headers)
+    if mode == 'x-sendfile':
+        offloaded.headers['X-Sendfile'] = os.path.abspath(path)
+    elif mode == 'x-accel-redirect':
+        relative = os.path.relpath(path, current_app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        offloaded.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'] + relative
+    else:
+        raise ValueError(f"Unknown UPLOAD_DELIVERY_MODE: {mode}")
+    return offloaded
+
+
+def send_upload(path, download_name=None, as_attachment=None, public=True):
+    """Send an uploaded file with long-lived cache validators.
+
+    Images are sent inline so they render (and cache) in the page; other
+    files are sent as attachments unless ``as_attachment`` says otherwise.
+    Files behind an authorization check pass ``public=False`` so shared
+    caches never store them. Returns None if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    if as_attachment is None:
+        ext = path.rsplit('.', 1)[-1].lower()
+        as_attachment = ext not in IMAGE_EXTENSIONS
+
+    response = send_file(
+        path,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        etag=content_etag(path, stat),
+        last_modified=stat.st_mtime,
+        max_age=current_app.config['UPLOAD_CACHE_MAX_AGE'] if public else 0,
+    )
+    if public:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return _offload(path, response)
+
+
+def allowed_file(filename):
+    """Check if file extension is allowed"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+def is_employee_file(filename):
+    """Check if file is allowed for employee uploads (PDF only)"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['EMPLOYEE_ALLOWED_EXTENSIONS']
+
+
+def secure_upload_file(file, is_employee=False):
+    """Sanitize and secure file upload.
+
+    Returns an IngestedUpload (filename, size, sha256), or None if no file was
+    submitted.
+    """
+    if not file or file.filename == '':
+        return None
+    
+    if is_employee:
+        if not is_employee_file(file.filename):
+            raise ValueError("Employees can only upload PDF files")
+    else:
+        if not allowed_file(file.filename):
+            raise ValueError(f"File type not allowed. Allowed: {', '.join(current_app.config['ALLOWED_EXTENSIONS'])}")
+    
+    # Stored under its content hash, never the user-supplied name
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    return ingest_upload(file.stream, ext, current_app.config['UPLOAD_FOLDER'])
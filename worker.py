@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Background job worker.
+
+    python worker.py [run] [threads]   run jobs until interrupted (default)
+    python worker.py drain             run every due job, then exit
+    python worker.py status            jobs per status and the latest failures
+    python worker.py retry             requeue failed jobs
+"""
+
+import logging
+import signal
+import sys
+from sqlalchemy import func
+from app import create_app
+from models import db, Job, JobStatus
+from jobs import Worker, retry_failed
+
+def main(argv):
+    command = argv[0] if argv else 'run'
+    app = create_app(with_routes=False)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    if command == 'run':
+        worker = Worker(app, threads=int(argv[1]) if len(argv) > 1 else None)
+        # Finish the jobs in hand on SIGTERM, as on Ctrl-C
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stopping.set())
+        print(f"Worker {worker.name} running {worker.threads} threads (Ctrl-C to stop)")
+        worker.run()
+        print("✅ Worker stopped")
+        return 0
+    if command == 'drain':
+        ran = Worker(app, threads=1).drain()
+        print(f"✅ {ran} jobs run")
+        return 0
+    with app.app_context():
+        if command == 'status':
+            counts = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+            for status in JobStatus:
+                print(f"  {status.value:8s} {counts.get(status.value, 0)}")
+            for job in Job.query.filter_by(status=JobStatus.FAILED.value).order_by(Job.finished_at.desc()).limit(10):
+                print(f"  #{job.id} {job.task} {job.payload} after {job.attempts} attempts: {job.last_error}")
+        elif command == 'retry':
+            requeued = retry_failed()
+            print(f"✅ {requeued} failed jobs requeued")
+        else:
+            print(__doc__)
+            return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))